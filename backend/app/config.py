@@ -25,7 +25,24 @@ class Settings(BaseSettings):
     DOCKER_BASE_PATH: str = "/tmp/openv_projects"
     DEFAULT_IMAGE: str = "openv-env:latest"
     ANTHROPIC_API_KEY: Optional[str] = None
-    
+
+    # Waveform indexing
+    VCD_INDEX_WORKERS: int = 2
+    VCD_INDEX_WAIT_SECONDS: float = 5.0
+    VCD_INDEX_SETTLE_SECONDS: float = 5.0
+    VCD_COMPRESS_WORKERS: int = 1
+    VCD_COMPRESS_MIN_SIZE: int = 1024 * 1024
+    VCD_COMPRESS_SETTLE_SECONDS: float = 5.0
+    ARTIFACT_MANIFEST_TTL_SECONDS: float = 2.0
+    VCD_TAIL_POLL_SECONDS: float = 0.5
+    VCD_CONVERT_BINARY: bool = True
+    VCD_CONVERT_WORKERS: int = 1
+    VCD_CONVERT_SETTLE_SECONDS: float = 5.0
+
+    # In-container pipeline agent
+    AGENT_TIMEOUT_MARGIN_SECONDS: float = 60.0
+    AGENT_POOL_SIZE: int = 2
+
     # Allows overriding via .env file
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
     
@@ -5,6 +5,8 @@ from app.routers import auth, projects, terminal, chat, vcd
 from app.database import create_db_and_tables
 from app.config import get_settings
 from app.services.cleanup_service import get_reaper
+from app.services.artifact_manifest import get_artifact_manifests
+from app.services.waveform_store import get_waveform_converter
 import asyncio
 
 settings = get_settings()
@@ -19,6 +21,9 @@ async def lifespan(app: FastAPI):
         print("="*60 + "\n")
 
     create_db_and_tables()
+    if settings.VCD_CONVERT_BINARY:
+        # Convert new dumps to the compact OWV format as the manifest discovers them
+        get_artifact_manifests().add_listener(get_waveform_converter().on_manifest_refresh)
     # Start the Reaper as a background task
     reaper = get_reaper()
     reaper_task = asyncio.create_task(reaper.run_reconciliation_loop())
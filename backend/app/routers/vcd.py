@@ -1,22 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse
 from sqlmodel import Session
 from app.database import get_session
 from app.models import Project, User
 from app.routers.auth import get_current_user
+from app.routers.terminal import get_user_from_token
 from app.config import get_settings
+from app.services.vcd_index import get_vcd_indexer
+from app.services.artifact_manifest import get_artifact_manifests
+from app.services.vcd_compression import get_waveform_compressor, negotiate_encodings
+from app.services.vcd_parser import read_header
+from app.services.vcd_tail import VCDTail
+from app.services.signal_search import get_name_index, SEARCH_MODES
+from app.services.waveform_store import get_waveform_converter
+from app.services.vcd_diff import diff_indexes
+import asyncio
 import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
+from typing import Optional
 
 router = APIRouter(prefix="/vcd", tags=["waveform"])
 settings = get_settings()
 
-def get_vcd_path(project_id: int, user_id: int, filename: str) -> Path:
+def get_project_path(project_id: int, user_id: int) -> Path:
     base_path = Path(settings.DOCKER_BASE_PATH).resolve()
+    return (base_path / str(user_id) / str(project_id)).resolve()
+
+def get_vcd_path(project_id: int, user_id: int, filename: str) -> Path:
     # Waveforms are usually in the project workspace
-    vcd_path = (base_path / str(user_id) / str(project_id) / filename).resolve()
+    project_path = get_project_path(project_id, user_id)
+    vcd_path = (project_path / filename).resolve()
     
-    if not vcd_path.is_relative_to(base_path):
+    if not vcd_path.is_relative_to(project_path):
          raise HTTPException(status_code=403, detail="Access denied")
     
     if not vcd_path.exists() or not vcd_path.is_file():
@@ -24,9 +41,71 @@ def get_vcd_path(project_id: int, user_id: int, filename: str) -> Path:
         
     return vcd_path
 
+class WaveformFileResponse(FileResponse):
+    """
+    FileResponse with large read chunks. Range / If-Range (206) handling comes from
+    Starlette, and full-file bodies go out via the ASGI `http.response.pathsend`
+    extension (zero-copy sendfile) when the server supports it.
+    """
+    chunk_size = 1024 * 1024
+
+def file_cache_headers(st: os.stat_result, suffix: str = "") -> dict:
+    return {
+        "ETag": f'"{st.st_mtime_ns:x}-{st.st_size:x}{suffix}"',
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+def is_not_modified(request: Request, headers: dict) -> bool:
+    """Evaluates If-None-Match (preferred) or If-Modified-Since against our validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or headers["ETag"] in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def get_vcd_index(project_id: int, user_id: int, filename: str):
+    """Returns the signal index for a waveform, or None while it is still being built."""
+    vcd_path = get_vcd_path(project_id, user_id, filename)
+    project_path = get_project_path(project_id, user_id)
+    try:
+        return await get_vcd_indexer().get_index(project_path, vcd_path, timeout=settings.VCD_INDEX_WAIT_SECONDS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to index waveform: {e}")
+
+async def get_waveform_reader(project_id: int, user_id: int, filename: str):
+    """
+    Reader for windowed signal queries: a converted OWV file when one is up to date,
+    otherwise the NumPy signal index. Both expose `signals`, `timescale`, `end_time`
+    and `window()`.
+    """
+    vcd_path = get_vcd_path(project_id, user_id, filename)
+    project_path = get_project_path(project_id, user_id)
+    try:
+        reader = await asyncio.to_thread(get_waveform_converter().reader, project_path, vcd_path)
+    except Exception as e:
+        print(f"Ignoring unreadable OWV for {vcd_path}: {e}")
+        reader = None
+    if reader is not None:
+        return reader
+    return await get_vcd_index(project_id, user_id, filename)
+
+def split_signal_names(names: str) -> list:
+    return [n for n in (n.strip() for n in names.split(",")) if n]
+
 @router.get("/{project_id}/list")
 async def list_vcd_files(
     project_id: int,
+    ext: str = Query(".vcd", description="Comma-separated artifact extensions, e.g. .vcd,.fst,.log"),
+    min_size: int = Query(0, ge=0, description="Only list artifacts of at least this many bytes"),
+    newest_first: bool = Query(False, description="Sort by modification time instead of path"),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
@@ -34,19 +113,25 @@ async def list_vcd_files(
     if not project or project.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
         
-    base_path = Path(settings.DOCKER_BASE_PATH).resolve()
-    project_path = (base_path / str(current_user.id) / str(project_id)).resolve()
+    project_path = get_project_path(project_id, current_user.id)
     
     if not project_path.exists():
         return []
         
-    vcd_files = []
-    for f in project_path.glob("**/*.vcd"):
-        vcd_files.append({
-            "name": f.name,
-            "path": str(f.relative_to(project_path)),
-            "size": f.stat().st_size
-        })
+    extensions = tuple(e.strip() for e in ext.split(",") if e.strip()) or None
+    manifest = await asyncio.to_thread(get_artifact_manifests().get, project_path)
+    vcd_files = manifest.list(extensions, min_size=min_size, newest_first=newest_first)
+
+    # Warm the signal index so the first waveform open is already a lookup. Dumps
+    # still being written are skipped: every poll would see a new version to re-parse.
+    # With binary conversion on, the OWV file serves waveform opens and the index is
+    # only built when an overview, activity or diff query first needs it.
+    if not settings.VCD_CONVERT_BINARY:
+        indexer = get_vcd_indexer()
+        now = time.time()
+        for f in vcd_files:
+            if f["name"].endswith(".vcd") and now - f["mtime"] >= settings.VCD_INDEX_SETTLE_SECONDS:
+                indexer.submit(project_path, project_path / f["path"])
     return vcd_files
 
 @router.get("/{project_id}/metadata")
@@ -62,32 +147,50 @@ async def get_vcd_metadata(
         
     vcd_path = get_vcd_path(project_id, current_user.id, filename)
     
-    # Simple metadata: timescale, signals found in first few KB
-    signals = []
-    timescale = "unknown"
     try:
-        with open(vcd_path, "r", errors='replace') as f:
-            for _ in range(500): # Scan first 500 lines
-                line = f.readline()
-                if not line: break
-                if "$timescale" in line:
-                    timescale = f.readline().strip()
-                if "$var" in line:
-                    parts = line.split()
-                    if len(parts) >= 5:
-                        signals.append({"name": parts[4], "type": parts[1]})
+        header = await asyncio.to_thread(read_header, vcd_path)
     except Exception as e:
          raise HTTPException(status_code=500, detail=f"Failed to parse metadata: {e}")
 
     return {
         "filename": filename,
         "size": vcd_path.stat().st_size,
-        "timescale": timescale,
-        "signals": signals
+        "timescale": header["timescale"],
+        "date": header["date"],
+        "version": header["version"],
+        "signals": header["vars"],
+        "scopes": header["scopes"]
     }
 
+@router.get("/{project_id}/search")
+async def search_vcd_signals(
+    project_id: int,
+    filename: str = Query(..., description="Relative path to VCD file"),
+    q: str = Query(..., description="Search text; a glob pattern such as top.*.valid in glob mode"),
+    mode: str = Query("substring", description="prefix | substring | glob"),
+    ignore_case: bool = Query(True),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    project = session.get(Project, project_id)
+    if not project or project.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid search mode. Must be one of {list(SEARCH_MODES)}")
+
+    vcd_path = get_vcd_path(project_id, current_user.id, filename)
+    try:
+        index = await asyncio.to_thread(get_name_index, vcd_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to parse metadata: {e}")
+
+    return {"filename": filename, "query": q, "mode": mode, **index.search(q, mode, offset, limit, ignore_case)}
+
 @router.get("/{project_id}/stream")
 async def stream_vcd(
+    request: Request,
     project_id: int,
     filename: str = Query(..., description="Relative path to VCD file"),
     current_user: User = Depends(get_current_user),
@@ -98,9 +201,273 @@ async def stream_vcd(
         raise HTTPException(status_code=403, detail="Access denied")
         
     vcd_path = get_vcd_path(project_id, current_user.id, filename)
-    
-    def iterfile():
-        with open(vcd_path, mode="rb") as file_like:
-            yield from file_like
+    st = vcd_path.stat()
+
+    # Compressed delivery for whole-file fetches; resumed (Range) fetches stay identity
+    # so byte offsets always refer to the raw VCD.
+    if st.st_size >= settings.VCD_COMPRESS_MIN_SIZE and "range" not in request.headers:
+        compressor = get_waveform_compressor()
+        encodings = negotiate_encodings(request.headers.get("accept-encoding"))
+        for encoding in encodings:
+            artifact = compressor.fresh_artifact(vcd_path, encoding, st)
+            if artifact is not None:
+                artifact_path, artifact_st = artifact
+                headers = file_cache_headers(st, suffix=f"-{encoding}")
+                headers["Content-Encoding"] = encoding
+                headers["Vary"] = "Accept-Encoding"
+                if is_not_modified(request, headers):
+                    return Response(status_code=304, headers=headers)
+                return WaveformFileResponse(artifact_path, media_type="application/octet-stream", headers=headers, stat_result=artifact_st)
+        if encodings and time.time() - st.st_mtime >= settings.VCD_COMPRESS_SETTLE_SECONDS:
+            # Produce the preferred encoding in the background for the next open. A dump
+            # still being written is skipped: its artifact would be stale before it is used.
+            compressor.submit(vcd_path, encodings[0])
+
+    headers = file_cache_headers(st)
+    headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+
+    return WaveformFileResponse(vcd_path, media_type="application/octet-stream", headers=headers, stat_result=st)
+
+@router.get("/{project_id}/signals")
+async def get_vcd_signals(
+    project_id: int,
+    filename: str = Query(..., description="Relative path to VCD file"),
+    names: str = Query(..., description="Comma-separated hierarchical signal names"),
+    t0: int = Query(0, ge=0, description="Window start (VCD time units)"),
+    t1: Optional[int] = Query(None, ge=0, description="Window end (VCD time units), defaults to end of dump"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    project = session.get(Project, project_id)
+    if not project or project.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    index = await get_waveform_reader(project_id, current_user.id, filename)
+    if index is None:
+        # Still building in the background; the client should retry shortly
+        return JSONResponse(status_code=202, content={"filename": filename, "status": "indexing"})
+
+    end = index.end_time if t1 is None else t1
+    if end < t0:
+        raise HTTPException(status_code=400, detail="t1 must be greater than or equal to t0")
+
+    signals = {}
+    missing = []
+    for name in split_signal_names(names):
+        if name in index.signals:
+            signals[name] = index.window(name, t0, end)
+        else:
+            missing.append(name)
+
+    return {
+        "filename": filename,
+        "timescale": index.timescale,
+        "t0": t0,
+        "t1": end,
+        "signals": signals,
+        "missing": missing
+    }
+
+@router.get("/{project_id}/overview")
+async def get_vcd_overview(
+    project_id: int,
+    filename: str = Query(..., description="Relative path to VCD file"),
+    names: str = Query(..., description="Comma-separated hierarchical signal names"),
+    width: int = Query(..., ge=1, le=16384, description="Viewport width in pixels"),
+    t0: int = Query(0, ge=0, description="Window start (VCD time units)"),
+    t1: Optional[int] = Query(None, ge=0, description="Window end (VCD time units), defaults to end of dump"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    project = session.get(Project, project_id)
+    if not project or project.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    index = await get_vcd_index(project_id, current_user.id, filename)
+    if index is None:
+        return JSONResponse(status_code=202, content={"filename": filename, "status": "indexing"})
+
+    end = index.end_time if t1 is None else t1
+    if end < t0:
+        raise HTTPException(status_code=400, detail="t1 must be greater than or equal to t0")
+
+    signals = {}
+    missing = []
+    for name in split_signal_names(names):
+        if name in index.signals:
+            signals[name] = index.overview(name, t0, end, width)
+        else:
+            missing.append(name)
+
+    return {
+        "filename": filename,
+        "timescale": index.timescale,
+        "t0": t0,
+        "t1": end,
+        "width": width,
+        "signals": signals,
+        "missing": missing
+    }
+
+@router.websocket("/{project_id}/tail")
+async def tail_vcd(
+    websocket: WebSocket,
+    project_id: int,
+    token: str = Query(...),
+    filename: str = Query(..., description="Relative path to VCD file"),
+    names: str = Query("", description="Comma-separated hierarchical signal names"),
+    session: Session = Depends(get_session)
+):
+    """
+    Follows a VCD while the simulation is still writing it.
+
+    Server -> client messages:
+      {"type": "header", "timescale": ..., "missing": [...]}
+      {"type": "changes", "time": t, "offset": bytes_read, "signals": {name: [[t, value], ...]}}
+      {"type": "reset"}  (file was truncated or replaced; a new header follows)
+    Client -> server: {"subscribe": [names...]} replaces the signal set.
+    """
+    await websocket.accept()
+
+    try:
+        user = await get_user_from_token(token, session)
+        project = session.get(Project, project_id)
+        if not project or project.user_id != user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        vcd_path = get_vcd_path(project_id, user.id, filename)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    tail = VCDTail(vcd_path, split_signal_names(names))
+
+    async def push_changes():
+        while True:
+            result = await asyncio.to_thread(tail.poll)
+            if result["reset"]:
+                await websocket.send_json({"type": "reset"})
+            if result["header"]:
+                await websocket.send_json({
+                    "type": "header",
+                    "timescale": tail.header["timescale"],
+                    "missing": tail.missing
+                })
+            if result["changes"]:
+                await websocket.send_json({
+                    "type": "changes",
+                    "time": tail.time,
+                    "offset": tail.offset,
+                    "signals": result["changes"]
+                })
+            if not result["more"]:
+                await asyncio.sleep(settings.VCD_TAIL_POLL_SECONDS)
+
+    async def read_subscriptions():
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if isinstance(message, dict) and isinstance(message.get("subscribe"), list):
+                    tail.subscribe([str(n) for n in message["subscribe"]])
+                    if tail.header is not None:
+                        await websocket.send_json({"type": "header", "timescale": tail.header["timescale"], "missing": tail.missing})
+        except WebSocketDisconnect:
+            pass
+
+    tasks = [
+        asyncio.create_task(push_changes()),
+        asyncio.create_task(read_subscriptions())
+    ]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                print(f"VCD tail error: {task.exception()}")
+    finally:
+        try:
+            await websocket.close()
+        except:
+            pass
+
+@router.get("/{project_id}/activity")
+async def get_vcd_activity(
+    project_id: int,
+    filename: str = Query(..., description="Relative path to VCD file"),
+    names: str = Query("", description="Comma-separated hierarchical signal names; all signals when empty"),
+    t0: int = Query(0, ge=0, description="Window start (VCD time units)"),
+    t1: Optional[int] = Query(None, ge=0, description="Window end (VCD time units), defaults to end of dump"),
+    top: Optional[int] = Query(None, ge=1, le=10000, description="Return only the N most active signals"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    project = session.get(Project, project_id)
+    if not project or project.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    index = await get_vcd_index(project_id, current_user.id, filename)
+    if index is None:
+        return JSONResponse(status_code=202, content={"filename": filename, "status": "indexing"})
+
+    end = index.end_time if t1 is None else t1
+    if end < t0:
+        raise HTTPException(status_code=400, detail="t1 must be greater than or equal to t0")
+
+    requested = split_signal_names(names)
+    # A whole-dump sweep reads every signal once; caching them all would hold the dump in memory
+    cache = bool(requested)
+    requested = requested or list(index.signals)
+    missing = [name for name in requested if name not in index.signals]
+
+    def compute():
+        stats = [index.activity(name, t0, end, cache=cache) for name in requested if name in index.signals]
+        if top is not None:
+            stats.sort(key=lambda s: s["toggles"], reverse=True)
+            stats = stats[:top]
+        return stats
+
+    return {
+        "filename": filename,
+        "timescale": index.timescale,
+        "t0": t0,
+        "t1": end,
+        "signals": await asyncio.to_thread(compute),
+        "missing": missing
+    }
+
+@router.get("/{project_id}/diff")
+async def diff_vcd_files(
+    project_id: int,
+    filename: str = Query(..., description="Relative path to the reference VCD file"),
+    other: str = Query(..., description="Relative path to the VCD file to compare against"),
+    names: str = Query("", description="Comma-separated hierarchical signal names; all common signals when empty"),
+    t0: int = Query(0, ge=0, description="Window start (VCD time units)"),
+    t1: Optional[int] = Query(None, ge=0, description="Window end (VCD time units), defaults to end of the longer dump"),
+    max_divergences: int = Query(100, ge=1, le=10000, description="Stop after this many differing signals"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    project = session.get(Project, project_id)
+    if not project or project.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    index_a, index_b = await asyncio.gather(
+        get_vcd_index(project_id, current_user.id, filename),
+        get_vcd_index(project_id, current_user.id, other)
+    )
+    if index_a is None or index_b is None:
+        return JSONResponse(status_code=202, content={"filename": filename, "other": other, "status": "indexing"})
+    if index_a.timescale != index_b.timescale:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Timescale mismatch: {index_a.timescale} vs {index_b.timescale}"
+        )
+    if t1 is not None and t1 < t0:
+        raise HTTPException(status_code=400, detail="t1 must be greater than or equal to t0")
 
-    return StreamingResponse(iterfile(), media_type="application/octet-stream")
+    result = await asyncio.to_thread(
+        diff_indexes, index_a, index_b, t0, t1, split_signal_names(names) or None, max_divergences
+    )
+    return {"filename": filename, "other": other, "timescale": index_a.timescale, **result}
@@ -0,0 +1,157 @@
+"""
+Client for the in-container pipeline agent (`mcp_server.py --serve-agent`).
+
+The agent listens on `.openv/agent.sock` inside the workspace, which the bind
+mount exposes on the host, so tool calls skip `docker exec` and interpreter
+startup. The protocol is newline-delimited JSON: one `{"id", "tool", "args"}`
+request per line, answered by `{"id", "ok", "result" | "error"}`.
+"""
+import itertools
+import json
+import os
+import socket
+import stat
+import threading
+from collections import defaultdict
+
+from app.config import get_settings
+
+AGENT_SOCKET_SUBPATH = ".openv/agent.sock"
+AGENT_START_COMMAND = "python3 mcp_server.py --serve-agent"
+# The agent's own per-tool wall clock limits (TOOL_TIMEOUTS defaults in mcp_server.py).
+# A call waits for the limit plus a margin, so the agent's timeout report arrives first.
+AGENT_TOOL_TIMEOUTS = {
+    "openv_get_status": 0,
+    "openv_init_test": 120,
+    "openv_lint": 600,
+    "openv_run_sim": 3600,
+    "openv_run_synth": 3600,
+    "openv_run_sta": 900,
+    "openv_run_pipeline": 600 + 3600 + 3600 + 900,
+}
+AGENT_CONNECT_TIMEOUT_SECONDS = 5.0
+
+
+class AgentUnavailable(Exception):
+    """The agent socket is missing or the connection failed before a reply arrived."""
+
+
+class AgentToolError(Exception):
+    """The agent answered, but the tool call raised."""
+
+
+class _Connection:
+    def __init__(self, path: str):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(AGENT_CONNECT_TIMEOUT_SECONDS)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("rb")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class AgentClient:
+    """Keeps up to `pool_size` idle connections per agent socket and reuses them across calls."""
+
+    def __init__(self, timeout_margin: float = 60.0, pool_size: int = 2):
+        self.timeout_margin = timeout_margin
+        self.pool_size = pool_size
+        self._idle = defaultdict(list)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _acquire(self, path: str):
+        with self._lock:
+            if self._idle[path]:
+                return self._idle[path].pop(), True
+        return self._connect(path), False
+
+    def _connect(self, path: str) -> _Connection:
+        # lstat: the workspace is user-writable, so only connect to a real socket, never a symlink
+        try:
+            st = os.lstat(path)
+        except OSError:
+            raise AgentUnavailable(f"No agent socket at {path}")
+        if not stat.S_ISSOCK(st.st_mode):
+            raise AgentUnavailable(f"{path} is not a socket")
+        try:
+            return _Connection(path)
+        except OSError as e:
+            raise AgentUnavailable(str(e)) from e
+
+    def _release(self, path: str, conn: _Connection):
+        with self._lock:
+            if len(self._idle[path]) < self.pool_size:
+                self._idle[path].append(conn)
+                return
+        conn.close()
+
+    def call_timeout(self, tool: str) -> float:
+        """Seconds to wait for `tool`: the agent's limit for it plus the margin."""
+        return AGENT_TOOL_TIMEOUTS.get(tool, max(AGENT_TOOL_TIMEOUTS.values())) + self.timeout_margin
+
+    def _roundtrip(self, conn: _Connection, request: bytes, timeout: float) -> bytes:
+        conn.sock.settimeout(timeout)
+        conn.sock.sendall(request)
+        line = conn.reader.readline()
+        if not line:
+            raise ConnectionResetError("Agent closed the connection")
+        return line
+
+    def call(self, socket_path: str, tool: str, args: dict = None):
+        """
+        Runs `tool` in the agent and returns its result. Raises AgentUnavailable only
+        when the request never reached an agent, so callers can safely fall back.
+        """
+        request = json.dumps({"id": next(self._ids), "tool": tool, "args": args or {}}).encode() + b"\n"
+        timeout = self.call_timeout(tool)
+        conn, pooled = self._acquire(socket_path)
+        try:
+            try:
+                line = self._roundtrip(conn, request, timeout)
+            except ConnectionError:
+                if not pooled:
+                    raise
+                # Idle connection outlived its agent (container restart); retry once on a fresh one
+                conn.close()
+                self.discard(socket_path)
+                conn = self._connect(socket_path)
+                line = self._roundtrip(conn, request, timeout)
+        except OSError as e:
+            # The tool may be running already; a timed-out stream also can't be reused
+            conn.close()
+            raise AgentToolError(f"Agent connection lost: {e}") from e
+
+        try:
+            reply = json.loads(line)
+        except ValueError as e:
+            # UnicodeDecodeError is a ValueError too; the stream is out of sync, so don't pool it
+            conn.close()
+            raise AgentToolError(f"Malformed agent reply: {e}") from e
+        if not isinstance(reply, dict):
+            conn.close()
+            raise AgentToolError(f"Malformed agent reply: {line[:200]!r}")
+        self._release(socket_path, conn)
+        if not reply.get("ok"):
+            raise AgentToolError(reply.get("error", "Unknown agent error"))
+        return reply.get("result")
+
+    def discard(self, socket_path: str):
+        """Closes all idle connections to an agent, e.g. when its container stops."""
+        with self._lock:
+            idle = self._idle.pop(socket_path, [])
+        for conn in idle:
+            conn.close()
+
+
+# Singleton instance for the service
+_agent_client = None
+
+def get_agent_client() -> AgentClient:
+    global _agent_client
+    if _agent_client is None:
+        settings = get_settings()
+        _agent_client = AgentClient(timeout_margin=settings.AGENT_TIMEOUT_MARGIN_SECONDS, pool_size=settings.AGENT_POOL_SIZE)
+    return _agent_client
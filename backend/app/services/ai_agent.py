@@ -1,8 +1,18 @@
+import json
+import shlex
+from app.services.agent_client import AGENT_START_COMMAND, AgentToolError, AgentUnavailable, get_agent_client
 from app.services.container_manager import ContainerManager
 
+# Slash commands backed by MCP pipeline tools: (tool name, arguments)
+TOOL_COMMANDS = {
+    "/unit": ("openv_init_test", {"test_path": "test/", "top_module": "top"}),
+    "/fix-unit": ("openv_run_sim", {"test_path": "test/"}),
+}
+
 class AIAgentService:
-    def __init__(self, container_manager: ContainerManager):
+    def __init__(self, container_manager: ContainerManager, agent_client=None):
         self.container_manager = container_manager
+        self.agent_client = agent_client or get_agent_client()
 
     def process_slash_command(self, container_id: str, command_text: str, session=None, project_id=None):
         """
@@ -10,25 +20,60 @@ class AIAgentService:
         """
         parts = command_text.split()
         cmd = parts[0].lower()
-        
+
         # In a real SaaS, this would invoke a state-aware agent instance.
         # For this phase, we map them to the MCP tools or standardized scripts.
         if cmd == "/plan":
             return self.execute_autopilot_task(container_id, "echo 'Architectural planning initiated...'", session, project_id)
-        elif cmd == "/unit":
-            # Example: call mcp_server logic or a specific script
-            sim_cmd = "python3 mcp_server.py --tool openv_init_test --args '{\"test_path\": \"test/\", \"top_module\": \"top\"}'"
-            return self.execute_autopilot_task(container_id, sim_cmd, session, project_id)
-        elif cmd == "/fix-unit":
-            sim_cmd = "python3 mcp_server.py --tool openv_run_sim --args '{\"test_path\": \"test/\"}'"
-            return self.execute_autopilot_task(container_id, sim_cmd, session, project_id)
-        
+        elif cmd in TOOL_COMMANDS:
+            tool, args = TOOL_COMMANDS[cmd]
+            return self.run_tool(container_id, tool, args, session, project_id)
+        elif cmd == "/pipeline":
+            # `/pipeline [LINT_PASSED|VERIFIED|SYNTHESIZED|TIMED]` reruns only the stale stages up to the target
+            args = {"target": parts[1].upper()} if len(parts) > 1 else {}
+            return self.run_tool(container_id, "openv_run_pipeline", args, session, project_id)
+
         return {"status": "error", "detail": f"Unknown command: {cmd}"}
 
+    def run_tool(self, container_id: str, tool: str, args: dict, session=None, project_id=None):
+        """
+        Calls a pipeline tool through the project's in-container agent. Without a
+        running agent the tool runs once through `docker exec` and the agent is
+        started in the background for the next call.
+        """
+        socket_path = self._agent_socket_path(session, project_id)
+        if socket_path:
+            try:
+                result = self.agent_client.call(socket_path, tool, args)
+                output = result if isinstance(result, str) else json.dumps(result, indent=2)
+                return {"status": "success", "output": output}
+            except AgentToolError as e:
+                return {"status": "error", "detail": str(e)}
+            except AgentUnavailable:
+                pass
+
+        cli_cmd = f"python3 mcp_server.py --tool {tool} --args {shlex.quote(json.dumps(args))}"
+        response = self.execute_autopilot_task(container_id, cli_cmd, session, project_id)
+        if socket_path:
+            try:
+                self.container_manager.exec_command(container_id, AGENT_START_COMMAND, detach=True)
+            except Exception:
+                pass  # the exec fallback keeps working without the agent
+        return response
+
+    def _agent_socket_path(self, session, project_id):
+        if not (session and project_id):
+            return None
+        from app.models import Project
+        project = session.get(Project, project_id)
+        if not project:
+            return None
+        return self.container_manager.agent_socket_path(project.user_id, project.id)
+
     def execute_autopilot_task(self, container_id: str, task_command: str, session=None, project_id=None):
         try:
             output = self.container_manager.exec_command(container_id, task_command)
-            
+
             # If this was a simulation command, update results
             if session and project_id and ("iverilog" in task_command or "vvp" in task_command or "pytest" in task_command):
                 from app.services.simulation_service import SimulationService
@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+
+# Simulation outputs worth listing: waveform dumps and tool logs
+ARTIFACT_EXTENSIONS = (".vcd", ".fst", ".ghw", ".lxt", ".lxt2", ".log")
+
+
+class ProjectManifest:
+    """
+    In-memory list of the artifacts in one project workspace.
+
+    Refreshing re-lists only directories whose mtime changed since the previous
+    scan (creating, deleting or renaming an entry bumps the parent's mtime) and
+    re-stats the artifacts already known, so growing dumps report their current size.
+    Hidden directories such as `.openv` and `.git` are skipped.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.scanned_at = None
+        self._dirs = {}  # dir -> (mtime_ns, subdirs, artifact names)
+        self._files = {}  # relative path -> entry; replaced, never mutated, by refresh()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            files = dict(self._files)
+            seen = set()
+            stack = [self.root]
+            while stack:
+                directory = stack.pop()
+                seen.add(directory)
+                try:
+                    mtime_ns = directory.stat().st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                known = self._dirs.get(directory)
+                if known is not None and known[0] == mtime_ns:
+                    subdirs, names = known[1], known[2]
+                else:
+                    subdirs, names = self._list_dir(directory)
+                    self._dirs[directory] = (mtime_ns, subdirs, names)
+                stack.extend(subdirs)
+                for name in names:
+                    self._stat_artifact(files, directory / name)
+
+            for directory in list(self._dirs):
+                if directory not in seen:
+                    del self._dirs[directory]
+            live = {
+                str((d / name).relative_to(self.root))
+                for d, (_, _, names) in self._dirs.items()
+                for name in names
+            }
+            for rel_path in list(files):
+                if rel_path not in live:
+                    del files[rel_path]
+            # Readers iterate whichever dict they picked up, so list() needs no lock
+            self._files = files
+            self.scanned_at = time.monotonic()
+
+    @staticmethod
+    def _list_dir(directory: Path):
+        subdirs = []
+        names = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(Path(entry.path))
+                    elif entry.name.endswith(ARTIFACT_EXTENSIONS) and entry.is_file():
+                        names.append(entry.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            pass
+        return subdirs, names
+
+    def _stat_artifact(self, files: dict, path: Path):
+        rel_path = str(path.relative_to(self.root))
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            files.pop(rel_path, None)
+            return
+        entry = files.get(rel_path)
+        if entry is None or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime:
+            files[rel_path] = {"name": path.name, "path": rel_path, "size": st.st_size, "mtime": st.st_mtime}
+
+    def list(self, extensions: Optional[tuple] = None, min_size: int = 0, newest_first: bool = False) -> list:
+        files = [
+            f for f in self._files.values()
+            if f["size"] >= min_size and (extensions is None or f["name"].endswith(extensions))
+        ]
+        if newest_first:
+            files.sort(key=lambda f: f["mtime"], reverse=True)
+        else:
+            files.sort(key=lambda f: f["path"])
+        return files
+
+
+class ArtifactManifestService:
+    """
+    Keeps one ProjectManifest per workspace. Lists are served from memory; when a
+    manifest is older than `ttl` seconds a background refresh is queued, so the
+    request never pays for a workspace walk except on the very first listing.
+    Listeners registered with add_listener() are called with the manifest after
+    every refresh (e.g. to start background work for new dumps).
+    """
+
+    def __init__(self, ttl: float = 2.0):
+        self.ttl = ttl
+        self._manifests = {}
+        self._refreshing = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-manifest")
+
+    def get(self, project_path: Path) -> ProjectManifest:
+        with self._lock:
+            manifest = self._manifests.get(project_path)
+            if manifest is None:
+                manifest = self._manifests[project_path] = ProjectManifest(project_path)
+        if manifest.scanned_at is None:
+            self._refresh(manifest)
+        elif time.monotonic() - manifest.scanned_at > self.ttl:
+            self._schedule_refresh(manifest)
+        return manifest
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _schedule_refresh(self, manifest: ProjectManifest):
+        with self._lock:
+            if manifest.root in self._refreshing:
+                return
+            self._refreshing.add(manifest.root)
+        self._executor.submit(self._background_refresh, manifest)
+
+    def _background_refresh(self, manifest: ProjectManifest):
+        try:
+            self._refresh(manifest)
+        finally:
+            with self._lock:
+                self._refreshing.discard(manifest.root)
+
+    def _refresh(self, manifest: ProjectManifest):
+        manifest.refresh()
+        for callback in self._listeners:
+            try:
+                callback(manifest)
+            except Exception as e:
+                print(f"[ArtifactManifest] Listener failed for {manifest.root}: {e}")
+
+    def forget(self, project_path: Path):
+        with self._lock:
+            self._manifests.pop(project_path, None)
+
+
+# Singleton instance for the service
+_manifests = None
+
+def get_artifact_manifests() -> ArtifactManifestService:
+    global _manifests
+    if _manifests is None:
+        _manifests = ArtifactManifestService(ttl=get_settings().ARTIFACT_MANIFEST_TTL_SECONDS)
+    return _manifests
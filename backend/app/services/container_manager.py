@@ -2,6 +2,7 @@ import docker
 import os
 from pathlib import Path
 from app.config import get_settings
+from app.services.agent_client import AGENT_SOCKET_SUBPATH
 
 class ContainerManager:
     def __init__(self):
@@ -86,14 +87,21 @@ class ContainerManager:
         socket = self.client.api.exec_start(exec_id, detach=False, tty=True, stream=True)
         return socket
 
-    def exec_command(self, container_id: str, command: str) -> str:
+    def exec_command(self, container_id: str, command: str, detach: bool = False) -> str:
         if not self.client:
             raise Exception("Docker client not initialized")
         
         container = self.client.containers.get(container_id)
+        if detach:
+            container.exec_run(command, detach=True)
+            return ""
         result = container.exec_run(command)
         return result.output.decode(errors='replace')
 
+    def agent_socket_path(self, user_id: int, project_id: int) -> str:
+        """Host-side path of the project's in-container agent socket (via the /workspace bind mount)."""
+        return str(Path(self._resolve_project_path(user_id, project_id)) / AGENT_SOCKET_SUBPATH)
+
     def get_container_stats(self, container_id: str):
         if not self.client:
             raise Exception("Docker client not initialized")
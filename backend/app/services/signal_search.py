@@ -0,0 +1,111 @@
+import os
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from pathlib import Path
+
+from app.services.vcd_parser import read_header
+
+SEARCH_MODES = ("prefix", "substring", "glob")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translates a shell-style glob to a regex matching within a single line (`*` never crosses names)."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "*":
+            out.append("[^\n]*")
+        elif c == "?":
+            out.append("[^\n]")
+        elif c == "[":
+            j = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("!", "]") else i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "^" + "".join(out) + "$"
+
+
+class SignalNameIndex:
+    """
+    Search structure over the full hierarchical names of a VCD header.
+
+    Names are kept sorted (exactly and case-folded), so prefix queries are two
+    bisections. Substring and glob queries run a single regex pass over all names
+    joined by newlines, which keeps the scan in C even for 100k+ signals.
+    Results always come back in name order, so offset/limit paging is stable.
+    """
+
+    def __init__(self, variables: list):
+        self._vars = sorted(variables, key=lambda v: v["name"])
+        self._views = {}
+
+    def _view(self, ignore_case: bool):
+        view = self._views.get(ignore_case)
+        if view is None:
+            if ignore_case:
+                order = sorted(range(len(self._vars)), key=lambda i: self._vars[i]["name"].lower())
+                keys = [self._vars[i]["name"].lower() for i in order]
+            else:
+                order = list(range(len(self._vars)))
+                keys = [v["name"] for v in self._vars]
+            joined = "\n".join(keys)
+            starts = [0] * len(keys)
+            pos = 0
+            for i, key in enumerate(keys):
+                starts[i] = pos
+                pos += len(key) + 1
+            view = self._views[ignore_case] = (order, keys, joined, starts)
+        return view
+
+    def search(self, query: str, mode: str = "substring", offset: int = 0, limit: int = 100, ignore_case: bool = True) -> dict:
+        order, keys, joined, starts = self._view(ignore_case)
+        q = query.lower() if ignore_case else query
+
+        if mode == "prefix":
+            lo = bisect_left(keys, q)
+            hi = bisect_right(keys, q + "\U0010ffff")
+            total = hi - lo
+            positions = range(lo + offset, min(hi, lo + offset + limit))
+        else:
+            if mode == "glob":
+                regex = re.compile(glob_to_regex(q), re.MULTILINE)
+            else:
+                regex = re.compile(re.escape(q))
+            # Each name contributes at most one hit, located by its start offset
+            hits = []
+            last = -1
+            for m in regex.finditer(joined):
+                i = bisect_right(starts, m.start()) - 1
+                if i != last:
+                    hits.append(i)
+                    last = i
+            total = len(hits)
+            positions = hits[offset:offset + limit]
+
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "results": [self._vars[order[i]] for i in positions],
+        }
+
+
+@lru_cache(maxsize=32)
+def _name_index(path: str, size: int, mtime_ns: int) -> SignalNameIndex:
+    return SignalNameIndex(read_header(Path(path))["vars"])
+
+
+def get_name_index(path: Path) -> SignalNameIndex:
+    """Name index for the VCD at `path`, cached by (path, size, mtime) like the header itself."""
+    st = os.stat(path)
+    return _name_index(str(path), st.st_size, st.st_mtime_ns)
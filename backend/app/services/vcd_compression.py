@@ -0,0 +1,131 @@
+import gzip
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # zstd delivery is simply not offered without the package
+    zstandard = None
+
+# Content-Encoding -> suffix of the cached artifact next to the source file
+ENCODING_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+_COPY_CHUNK = 1024 * 1024
+
+
+def available_encodings() -> list:
+    """Encodings we can produce, in server preference order."""
+    return [enc for enc in ENCODING_SUFFIXES if enc != "zstd" or zstandard is not None]
+
+
+def negotiate_encodings(accept_encoding: Optional[str]) -> list:
+    """
+    Parses an Accept-Encoding header and returns the acceptable encodings we
+    support, best first (client q-value, then server preference).
+    """
+    if not accept_encoding:
+        return []
+    qvalues = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qvalues[name.strip().lower()] = q
+
+    ranked = []
+    for rank, enc in enumerate(available_encodings()):
+        q = qvalues.get(enc, qvalues.get("*", 0.0))
+        if q > 0:
+            ranked.append((-q, rank, enc))
+    return [enc for _, _, enc in sorted(ranked)]
+
+
+def compress_file(src: Path, dst: Path, encoding: str) -> Optional[Path]:
+    """
+    Compresses `src` into `dst` atomically. The artifact inherits the source mtime,
+    which is what freshness checks compare against. Returns None if the source
+    changed while being compressed (e.g. a simulation still writing it).
+    """
+    before = src.stat()
+    tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(src, "rb") as f_in, open(tmp_path, "wb") as f_out:
+            if encoding == "zstd":
+                zstandard.ZstdCompressor(level=3, threads=-1).copy_stream(f_in, f_out, read_size=_COPY_CHUNK)
+            else:
+                with gzip.GzipFile(fileobj=f_out, mode="wb", compresslevel=6, mtime=0) as gz:
+                    shutil.copyfileobj(f_in, gz, _COPY_CHUNK)
+        after = src.stat()
+        if (after.st_mtime_ns, after.st_size) != (before.st_mtime_ns, before.st_size):
+            tmp_path.unlink(missing_ok=True)
+            return None
+        os.utime(tmp_path, ns=(after.st_atime_ns, after.st_mtime_ns))
+        os.replace(tmp_path, dst)
+        return dst
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class WaveformCompressor:
+    """
+    Produces compressed copies of waveforms (`dump.vcd.gz`, `dump.vcd.zst`) on a
+    background pool, once per source version. Requests never wait for compression;
+    they fall back to identity encoding until the artifact is ready.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vcd-compress")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def artifact_path(vcd_path: Path, encoding: str) -> Path:
+        return vcd_path.with_name(vcd_path.name + ENCODING_SUFFIXES[encoding])
+
+    def fresh_artifact(self, vcd_path: Path, encoding: str, st: os.stat_result):
+        """Returns (path, stat) of an up-to-date compressed copy, or None."""
+        artifact = self.artifact_path(vcd_path, encoding)
+        try:
+            artifact_st = artifact.stat()
+        except FileNotFoundError:
+            return None
+        if artifact_st.st_mtime_ns != st.st_mtime_ns:
+            return None
+        return artifact, artifact_st
+
+    def submit(self, vcd_path: Path, encoding: str) -> Future:
+        artifact = self.artifact_path(vcd_path, encoding)
+        with self._lock:
+            future = self._pending.get(artifact)
+            if future is not None:
+                return future
+            future = self._executor.submit(compress_file, vcd_path, artifact, encoding)
+            self._pending[artifact] = future
+        future.add_done_callback(lambda done: self._forget(artifact, done))
+        return future
+
+    def _forget(self, artifact: Path, future: Future):
+        with self._lock:
+            if self._pending.get(artifact) is future:
+                del self._pending[artifact]
+
+
+# Singleton instance for the service
+_compressor = None
+
+def get_waveform_compressor() -> WaveformCompressor:
+    global _compressor
+    if _compressor is None:
+        _compressor = WaveformCompressor(max_workers=get_settings().VCD_COMPRESS_WORKERS)
+    return _compressor
@@ -0,0 +1,103 @@
+from typing import Optional
+
+import numpy as np
+
+from app.services.vcd_index import VCDIndex
+
+
+def _known_bits(raw: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """True where a raw value is a non-empty string of 0/1 digits."""
+    return present & (np.char.str_len(raw) > 0) & (np.char.str_len(np.char.strip(raw, b"01")) == 0)
+
+
+def first_divergence(a: tuple, b: tuple, t0: int, t1: int, is_real: bool = False) -> Optional[tuple]:
+    """
+    First time in [t0, t1] at which two change streams hold different values.
+
+    Both streams are sampled at the union of their change times. Values are equal
+    when their raw text matches or, for known vectors, when the bit strings match
+    once leading zeros are dropped (so `b0010` and `b10` from different simulators
+    compare equal at any width). Reals compare numerically.
+    Returns (time, value_a, value_b) or None.
+    """
+    ta, va, na = a
+    tb, vb, nb = b
+    lo_a = max(int(np.searchsorted(ta, t0, side="right")) - 1, 0)
+    lo_b = max(int(np.searchsorted(tb, t0, side="right")) - 1, 0)
+    hi_a = int(np.searchsorted(ta, t1, side="right"))
+    hi_b = int(np.searchsorted(tb, t1, side="right"))
+    times = np.union1d(ta[lo_a:hi_a], tb[lo_b:hi_b])
+    times = np.unique(np.clip(times, t0, None))
+    if len(times) == 0:
+        return None
+
+    ia = np.searchsorted(ta, times, side="right") - 1
+    ib = np.searchsorted(tb, times, side="right") - 1
+    # Before a stream's first change its value is undefined; compare as empty text
+    has_a = ia >= 0
+    has_b = ib >= 0
+    raw_a = np.where(has_a, va[np.maximum(ia, 0)] if len(va) else b"", b"")
+    raw_b = np.where(has_b, vb[np.maximum(ib, 0)] if len(vb) else b"", b"")
+
+    if is_real:
+        num_a = np.where(has_a, na[np.maximum(ia, 0)] if len(na) else np.nan, np.nan)
+        num_b = np.where(has_b, nb[np.maximum(ib, 0)] if len(nb) else np.nan, np.nan)
+        same = num_a == num_b
+    else:
+        # Not the float column: it can't tell apart vectors wider than 53 bits
+        known = _known_bits(raw_a, has_a) & _known_bits(raw_b, has_b)
+        same = known & (np.char.lstrip(raw_a, b"0") == np.char.lstrip(raw_b, b"0"))
+    differs = (raw_a != raw_b) & ~same
+    hits = np.flatnonzero(differs)
+    if len(hits) == 0:
+        return None
+    i = int(hits[0])
+    return int(times[i]), raw_a[i].decode(errors="replace"), raw_b[i].decode(errors="replace")
+
+
+def diff_indexes(
+    a: VCDIndex,
+    b: VCDIndex,
+    t0: int = 0,
+    t1: Optional[int] = None,
+    names: Optional[list] = None,
+    max_divergences: int = 100,
+) -> dict:
+    """
+    Compares two dumps of the same design signal by signal, aligned by
+    hierarchical name. Only one signal's arrays from each dump are held at a time,
+    and the sweep stops once `max_divergences` differing signals are found. A
+    truncated sweep has no `first_divergence`: an unscanned signal may diverge earlier.
+    """
+    end = max(a.end_time, b.end_time) if t1 is None else t1
+    candidates = names if names is not None else sorted(set(a.signals) | set(b.signals))
+    only_in_a = [n for n in candidates if n in a.signals and n not in b.signals]
+    only_in_b = [n for n in candidates if n in b.signals and n not in a.signals]
+
+    divergent = []
+    compared = 0
+    truncated = False
+    for name in candidates:
+        if name not in a.signals or name not in b.signals:
+            continue
+        if len(divergent) >= max_divergences:
+            truncated = True
+            break
+        compared += 1
+        is_real = a.signals[name]["type"] in ("real", "realtime")
+        hit = first_divergence(a.arrays(name, cache=False), b.arrays(name, cache=False), t0, end, is_real)
+        if hit is not None:
+            time, value_a, value_b = hit
+            divergent.append({"name": name, "time": time, "a": value_a, "b": value_b})
+
+    divergent.sort(key=lambda d: (d["time"], d["name"]))
+    return {
+        "t0": t0,
+        "t1": end,
+        "compared": compared,
+        "first_divergence": divergent[0]["time"] if divergent and not truncated else None,
+        "divergent": divergent,
+        "only_in_a": only_in_a,
+        "only_in_b": only_in_b,
+        "truncated": truncated,
+    }
@@ -0,0 +1,406 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import zipfile
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.vcd_parser import VCDChangeDecoder, parse_header, iter_changes
+
+INDEX_VERSION = 4
+# Signals up to this width have integer values float32 represents exactly
+FLOAT32_EXACT_WIDTH = 24
+# Upper bound on changes buffered across all signals before they are flushed to disk
+MAX_BUFFERED = 1 << 20
+CACHE_SUBDIR = Path(".openv") / "cache" / "vcd"
+
+
+def _numeric(value: bytes, is_real: bool) -> float:
+    """Numeric view of a VCD value; NaN for anything containing x/z/u/etc."""
+    try:
+        return float(value) if is_real else float(int(value, 2))
+    except ValueError:
+        return math.nan
+
+
+def pyramid_dtype(value_dtype=np.float32) -> np.dtype:
+    """One row per non-empty bucket of a level-of-detail pyramid level."""
+    return np.dtype([("bucket", "i8"), ("min", value_dtype), ("max", value_dtype), ("count", "i8"), ("last", value_dtype)])
+
+
+def build_pyramid(t: np.ndarray, n: np.ndarray, value_dtype=np.float32):
+    """
+    Min/max/transition-count buckets at power-of-two time resolutions (level L
+    buckets span 2**L time units). Each bucket's min/max also covers the value
+    carried in from before it, so a renderer can draw it without neighbours.
+    A level is only stored once it has at most half the rows of the previous
+    stored level (the raw changes for the first), so the whole pyramid holds
+    no more rows than the signal has changes.
+
+    Returns (rows, levels) where `levels` holds [level, offset] per stored level
+    plus a terminating row with the total row count.
+    """
+    dtype = pyramid_dtype(value_dtype)
+    rows = []
+    levels = []
+    offset = 0
+    if len(t) < 2:
+        return np.empty(0, dtype=dtype), np.array([[0, 0]], dtype=np.int64)
+
+    # Level 1 from the raw changes
+    b = t >> 1
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    ends = np.r_[starts[1:], len(t)]
+    level = np.empty(len(starts), dtype=dtype)
+    level["bucket"] = b[starts]
+    level["min"] = np.fmin.reduceat(n, starts)
+    level["max"] = np.fmax.reduceat(n, starts)
+    level["min"][1:] = np.fmin(level["min"][1:], n[starts[1:] - 1])
+    level["max"][1:] = np.fmax(level["max"][1:], n[starts[1:] - 1])
+    level["count"] = ends - starts
+    level["last"] = n[ends - 1]
+    stored_count = len(t)
+
+    # Each coarser level merges pairs of buckets from the previous one
+    lvl = 1
+    while True:
+        if 2 * len(level) <= stored_count:
+            levels.append([lvl, offset])
+            rows.append(level)
+            offset += len(level)
+            stored_count = len(level)
+        if len(level) <= 1:
+            break
+        b = level["bucket"] >> 1
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+        ends = np.r_[starts[1:], len(level)]
+        merged = np.empty(len(starts), dtype=dtype)
+        merged["bucket"] = b[starts]
+        merged["min"] = np.fmin.reduceat(level["min"], starts)
+        merged["max"] = np.fmax.reduceat(level["max"], starts)
+        merged["count"] = np.add.reduceat(level["count"], starts)
+        merged["last"] = level["last"][ends - 1]
+        level = merged
+        lvl += 1
+
+    levels.append([0, offset])
+    pyramid = np.concatenate(rows) if rows else np.empty(0, dtype=dtype)
+    return pyramid, np.array(levels, dtype=np.int64)
+
+
+def _json_float(x: float):
+    return None if math.isnan(x) else float(x)
+
+
+def _numeric_column(values: np.ndarray, is_real: bool) -> np.ndarray:
+    """Numeric view of a raw value column, converting each distinct value once."""
+    if not len(values):
+        return np.empty(0, dtype=np.float64)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    return np.array([_numeric(v, is_real) for v in distinct], dtype=np.float64)[inverse]
+
+
+def _read_spilled(spill, chunks: list):
+    """Reassembles one signal's (times, raw values) from its spilled chunks."""
+    times = []
+    values = []
+    for offset, count, length in chunks:
+        spill.seek(offset)
+        times.append(np.frombuffer(spill.read(count * 8), dtype=np.int64))
+        values.extend(spill.read(length).split(b"\n"))
+    t = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+    v = np.array(values, dtype=bytes) if values else np.empty(0, dtype="S1")
+    return t, v
+
+
+def _write_npy(zf: zipfile.ZipFile, name: str, array: np.ndarray):
+    # Same member layout as np.savez_compressed, one array at a time
+    with zf.open(f"{name}.npy", "w", force_zip64=True) as fh:
+        np.lib.format.write_array(fh, np.asanyarray(array), allow_pickle=False)
+
+
+def build_index(vcd_path: Path, sidecar_path: Path) -> Path:
+    """
+    Parses a VCD once and writes a columnar sidecar (.npz) with, per signal,
+    time-sorted change times (`t<k>`), raw values (`v<k>`), numeric values (`n<k>`)
+    and a min/max level-of-detail pyramid (`p<k>`, level table `pl<k>`).
+
+    Changes are spilled to a temporary file every MAX_BUFFERED changes and the
+    sidecar is then written one signal at a time, so memory follows the largest
+    signal rather than the whole dump.
+    """
+    sidecar_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = sidecar_path.with_name(sidecar_path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(vcd_path, "rb") as f, tempfile.TemporaryFile(dir=sidecar_path.parent) as spill:
+            header = parse_header(f)
+            keys = {}
+            for var in header["vars"]:
+                keys.setdefault(var["id"].encode(), len(keys))
+            times = [array("q") for _ in keys]
+            values = [[] for _ in keys]
+            chunks = [[] for _ in keys]  # (offset, count, value bytes) per spilled chunk
+
+            def flush():
+                for k in range(len(keys)):
+                    if times[k]:
+                        payload = b"\n".join(values[k])
+                        chunks[k].append((spill.tell(), len(times[k]), len(payload)))
+                        spill.write(times[k].tobytes())
+                        spill.write(payload)
+                        times[k] = array("q")
+                        values[k] = []
+
+            buffered = 0
+            decoder = VCDChangeDecoder()
+            for t, ident, value in iter_changes(f, header["body_offset"], decoder):
+                k = keys.get(ident)
+                if k is None:
+                    continue
+                times[k].append(t)
+                values[k].append(value)
+                buffered += 1
+                if buffered >= MAX_BUFFERED:
+                    flush()
+                    buffered = 0
+            flush()
+            # The dump runs to its last #timestamp, even when nothing changes there
+            end_time = decoder.time
+
+            # Pyramid values are float32 unless that would round them (reals, wide vectors)
+            real_keys = {keys[v["id"].encode()] for v in header["vars"] if v["type"] in ("real", "realtime")}
+            wide_keys = real_keys | {keys[v["id"].encode()] for v in header["vars"] if v["width"] > FLOAT32_EXACT_WIDTH}
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                for k in range(len(keys)):
+                    t, v = _read_spilled(spill, chunks[k])
+                    n = _numeric_column(v, k in real_keys)
+                    p, pl = build_pyramid(t, n, np.float64 if k in wide_keys else np.float32)
+                    for name, column in ((f"t{k}", t), (f"v{k}", v), (f"n{k}", n), (f"p{k}", p), (f"pl{k}", pl)):
+                        _write_npy(zf, name, column)
+
+                meta = {
+                    "version": INDEX_VERSION,
+                    "timescale": header["timescale"],
+                    "end_time": end_time,
+                    "signals": [dict(var, key=keys[var["id"].encode()]) for var in header["vars"]],
+                }
+                _write_npy(zf, "meta", np.array(json.dumps(meta)))
+        os.replace(tmp_path, sidecar_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    # Drop sidecars built for previous versions of the same file
+    prefix = sidecar_path.name.split("-", 1)[0]
+    for stale in sidecar_path.parent.glob(f"{prefix}-*.npz"):
+        if stale != sidecar_path:
+            stale.unlink(missing_ok=True)
+    return sidecar_path
+
+
+class VCDIndex:
+    """Read-only view over a sidecar; signal arrays are loaded lazily on first access."""
+
+    def __init__(self, sidecar_path: Path):
+        self._npz = np.load(sidecar_path, allow_pickle=False)
+        self.meta = json.loads(str(self._npz["meta"]))
+        self.timescale = self.meta["timescale"]
+        self.end_time = self.meta["end_time"]
+        self.signals = {s["name"]: s for s in self.meta["signals"]}
+        self._lock = threading.Lock()
+        self._loaded = {}
+
+    def arrays(self, name: str, cache: bool = True):
+        """
+        Returns (times, raw_values, numeric_values) for a hierarchical signal name.
+        With cache=False the arrays are read without being kept, for whole-dump sweeps.
+        """
+        k = self.signals[name]["key"]
+        with self._lock:
+            loaded = self._loaded.get(k)
+            if loaded is None:
+                loaded = (self._npz[f"t{k}"], self._npz[f"v{k}"], self._npz[f"n{k}"])
+                if cache:
+                    self._loaded[k] = loaded
+            return loaded
+
+    def window(self, name: str, t0: int, t1: int) -> list:
+        """
+        Value changes of `name` in [t0, t1]. The first entry carries the value
+        in effect at t0, so the client can draw the window without extra context.
+        """
+        t, v, _ = self.arrays(name)
+        lo = max(int(np.searchsorted(t, t0, side="right")) - 1, 0)
+        hi = int(np.searchsorted(t, t1, side="right"))
+        return [[int(ts), val.decode(errors="replace")] for ts, val in zip(t[lo:hi], v[lo:hi])]
+
+    def activity(self, name: str, t0: int, t1: int, cache: bool = True) -> dict:
+        """
+        Toggle count, duty cycle and first/last transition of `name` in [t0, t1].
+
+        A toggle is a change to a different raw value (repeated dumps of the same
+        value do not count). `duty_cycle` is the fraction of the window during which
+        the value is known and non-zero (logic high for 1-bit signals);
+        `unknown_fraction` covers x/z values and any time before the first change.
+        Pass cache=False when sweeping every signal, so the sweep doesn't pin the whole dump.
+        """
+        t, v, n = self.arrays(name, cache=cache)
+        span = t1 - t0
+        lo = max(int(np.searchsorted(t, t0, side="right")) - 1, 0)
+        hi = int(np.searchsorted(t, t1, side="right"))
+        stats = {
+            "name": name,
+            "width": self.signals[name]["width"],
+            "toggles": 0,
+            "duty_cycle": 0.0,
+            "unknown_fraction": 1.0,
+            "first_transition": None,
+            "last_transition": None,
+        }
+        if hi <= lo or span <= 0:
+            return stats
+
+        times = t[lo:hi]
+        values = v[lo:hi]
+        toggled = values[1:] != values[:-1]
+        toggle_times = times[1:][toggled & (times[1:] >= t0)]
+        stats["toggles"] = int(len(toggle_times))
+        if len(toggle_times):
+            stats["first_transition"] = int(toggle_times[0])
+            stats["last_transition"] = int(toggle_times[-1])
+
+        # Time each value is held within the window
+        starts = np.clip(times, t0, t1)
+        held = np.diff(np.append(starts, t1))
+        numeric = n[lo:hi]
+        known = ~np.isnan(numeric)
+        stats["duty_cycle"] = float(held[known & (numeric != 0)].sum() / span)
+        stats["unknown_fraction"] = float(1.0 - held[known].sum() / span)
+        return stats
+
+    def overview(self, name: str, t0: int, t1: int, width: int) -> dict:
+        """
+        At most O(width) points describing `name` over [t0, t1], for drawing
+        `width` pixels. Falls back to raw changes when they are already sparse enough.
+        """
+        t, v, _ = self.arrays(name)
+        lo = max(int(np.searchsorted(t, t0, side="right")) - 1, 0)
+        hi = int(np.searchsorted(t, t1, side="right"))
+        initial = v[lo].decode(errors="replace") if len(v) else None
+
+        target = math.ceil(math.log2((t1 - t0) / width)) if t1 - t0 > width else 0
+        if target == 0 or hi - lo <= 2 * width:
+            return {"mode": "raw", "initial": initial, "points": self.window(name, t0, t1)}
+
+        k = self.signals[name]["key"]
+        with self._lock:
+            if ("p", k) not in self._loaded:
+                self._loaded[("p", k)] = (self._npz[f"p{k}"], self._npz[f"pl{k}"])
+            pyramid, levels = self._loaded[("p", k)]
+
+        # The finest stored level at least as coarse as one pixel. Levels that would
+        # not halve the rows are not stored, so this may be coarser than asked for.
+        stored = levels[:-1]
+        if len(stored) == 0:
+            return {"mode": "raw", "initial": initial, "points": self.window(name, t0, t1)}
+        i = min(int(np.searchsorted(stored[:, 0], target)), len(stored) - 1)
+        level, start, end = int(stored[i, 0]), int(levels[i, 1]), int(levels[i + 1, 1])
+        rows = pyramid[start:end]
+        b_lo = int(np.searchsorted(rows["bucket"], t0 >> level, side="left"))
+        b_hi = int(np.searchsorted(rows["bucket"], t1 >> level, side="right"))
+        return {
+            "mode": "lod",
+            "level": level,
+            "bucket": 1 << level,
+            "initial": initial,
+            "points": [
+                [int(r["bucket"]) << level, _json_float(r["min"]), _json_float(r["max"]), int(r["count"]), _json_float(r["last"])]
+                for r in rows[b_lo:b_hi]
+            ],
+        }
+
+
+@lru_cache(maxsize=32)
+def _open_index(sidecar: str) -> VCDIndex:
+    return VCDIndex(Path(sidecar))
+
+
+class VCDIndexer:
+    """
+    Builds VCD sidecar indexes on a background thread pool.
+    Sidecars are keyed by source path, mtime and size, so a rewritten dump is re-indexed
+    and concurrent requests for the same file share a single build.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vcd-index")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def sidecar_path(project_path: Path, vcd_path: Path, st: Optional[os.stat_result] = None) -> Path:
+        st = st or vcd_path.stat()
+        path_key = hashlib.sha1(str(vcd_path.relative_to(project_path)).encode()).hexdigest()[:16]
+        return project_path / CACHE_SUBDIR / f"{path_key}-{st.st_mtime_ns:x}-{st.st_size:x}-v{INDEX_VERSION}.npz"
+
+    def submit(self, project_path: Path, vcd_path: Path) -> Future:
+        """Schedules an index build unless a fresh sidecar exists or one is already in flight."""
+        sidecar = self.sidecar_path(project_path, vcd_path)
+        prefix = sidecar.name.split("-", 1)[0]
+        with self._lock:
+            future = self._pending.get(sidecar)
+            if future is not None:
+                return future
+            # A queued build for an older version of the same file is superseded
+            for queued_sidecar, queued in self._pending.items():
+                if queued_sidecar.parent == sidecar.parent and queued_sidecar.name.split("-", 1)[0] == prefix:
+                    queued.cancel()
+            if sidecar.exists():
+                future = Future()
+                future.set_result(sidecar)
+                return future
+            future = self._executor.submit(build_index, vcd_path, sidecar)
+            self._pending[sidecar] = future
+        future.add_done_callback(lambda done: self._forget(sidecar, done))
+        return future
+
+    def _forget(self, sidecar: Path, future: Future):
+        with self._lock:
+            if self._pending.get(sidecar) is future:
+                del self._pending[sidecar]
+
+    async def get_index(self, project_path: Path, vcd_path: Path, timeout: Optional[float] = None) -> Optional[VCDIndex]:
+        """
+        Returns the index for `vcd_path`, building it if needed.
+        Returns None if the build is still running after `timeout` seconds.
+        """
+        build = self.submit(project_path, vcd_path)
+        try:
+            sidecar = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(build)), timeout)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.CancelledError:
+            if not build.cancelled():
+                raise
+            return None  # superseded by a newer version of the file
+        return await asyncio.to_thread(_open_index, str(sidecar))
+
+
+# Singleton instance for the service
+_indexer = None
+
+def get_vcd_indexer() -> VCDIndexer:
+    global _indexer
+    if _indexer is None:
+        _indexer = VCDIndexer(max_workers=get_settings().VCD_INDEX_WORKERS)
+    return _indexer
@@ -0,0 +1,199 @@
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+
+# Single-character scalar value codes defined by IEEE 1364 (plus the 9-state extensions).
+SCALAR_VALUES = b"01xXzZuUwWlLhH-"
+
+_TOKEN_RE = re.compile(rb"\S+")
+_CHUNK_SIZE = 1 << 20
+_HEADER_CHUNK_SIZE = 1 << 16
+
+
+class VCDTokenizer:
+    """
+    Splits a byte stream into whitespace separated tokens.
+    Tokens that straddle a chunk boundary are held back until the next feed().
+    """
+
+    def __init__(self):
+        self._tail = b""
+
+    def feed(self, data: bytes) -> list:
+        if self._tail:
+            data = self._tail + data
+        tokens = data.split()
+        if tokens and not data[-1:].isspace():
+            self._tail = tokens.pop()
+        else:
+            self._tail = b""
+        return tokens
+
+    def flush(self) -> list:
+        tail, self._tail = self._tail, b""
+        return [tail] if tail else []
+
+
+class VCDChangeDecoder:
+    """
+    Turns value change section tokens into (time, id_code, value) tuples.
+    State (current time, half-read vector changes, open $comment blocks) is kept
+    between calls so the decoder can be fed from a growing file.
+    """
+
+    def __init__(self, time: int = 0):
+        self.time = time
+        self._pending = None
+        self._skipping = False
+
+    def decode(self, tokens) -> list:
+        changes = []
+        append = changes.append
+        time = self.time
+        pending = self._pending
+        skipping = self._skipping
+        for tok in tokens:
+            if pending is not None:
+                append((time, tok, pending))
+                pending = None
+                continue
+            if skipping:
+                if tok == b"$end":
+                    skipping = False
+                continue
+            c = tok[0]
+            if c == 35:  # '#'
+                time = int(tok[1:])
+            elif c in (98, 66, 114, 82):  # 'b', 'B', 'r', 'R'
+                pending = tok[1:]
+            elif c == 36:  # '$'
+                # $dumpvars / $dumpall / $dumpon / $dumpoff / $end only bracket changes
+                if tok == b"$comment":
+                    skipping = True
+            elif c in SCALAR_VALUES:
+                append((time, tok[1:], tok[:1]))
+        self.time = time
+        self._pending = pending
+        self._skipping = skipping
+        return changes
+
+
+def parse_header(f) -> dict:
+    """
+    Parses the declaration section of a VCD file opened in binary mode.
+    Reads up to (and including) `$enddefinitions $end` and records the byte
+    offset at which the value change section starts.
+
+    `vars` is the flat list of declarations with full hierarchical names;
+    `scopes` is the same information as a tree of
+    {"name", "type", "scopes": [...], "vars": [...]} nodes.
+    """
+    header = {"timescale": "unknown", "date": None, "version": None, "vars": [], "scopes": [], "body_offset": None}
+    root = {"scopes": header["scopes"], "vars": []}
+    stack = [root]
+    scope = []
+    command = None
+    args = []
+    buf = b""
+    base = f.tell()
+    while header["body_offset"] is None:
+        chunk = f.read(_HEADER_CHUNK_SIZE)
+        eof = not chunk
+        buf += chunk
+        consumed = 0
+        for m in _TOKEN_RE.finditer(buf):
+            if not eof and m.end() == len(buf):
+                break  # token may continue in the next chunk
+            consumed = m.end()
+            tok = m.group()
+            if command is None:
+                if tok.startswith(b"$"):
+                    command = tok
+                    args = []
+                continue
+            if tok != b"$end":
+                args.append(tok)
+                continue
+
+            if command == b"$scope":
+                name = args[1].decode(errors="replace") if len(args) > 1 else ""
+                node = {
+                    "name": name,
+                    "type": args[0].decode(errors="replace") if args else "module",
+                    "scopes": [],
+                    "vars": [],
+                }
+                stack[-1]["scopes"].append(node)
+                stack.append(node)
+                scope.append(name)
+            elif command == b"$upscope":
+                if scope:
+                    scope.pop()
+                    stack.pop()
+            elif command == b"$var":
+                if len(args) >= 4:
+                    ref = args[3].decode(errors="replace")
+                    var = {
+                        "name": ref,
+                        "type": args[0].decode(errors="replace"),
+                        "width": int(args[1]) if args[1].isdigit() else 1,
+                        "id": args[2].decode(errors="replace"),
+                        "range": b"".join(args[4:]).decode(errors="replace") or None,
+                    }
+                    stack[-1]["vars"].append(var)
+                    header["vars"].append(dict(var, name=".".join(scope + [ref])))
+            elif command == b"$timescale":
+                header["timescale"] = b"".join(args).decode(errors="replace")
+            elif command in (b"$date", b"$version"):
+                header[command[1:].decode()] = b" ".join(args).decode(errors="replace")
+            elif command == b"$enddefinitions":
+                header["body_offset"] = base + m.end()
+                break
+            command = None
+
+        base += consumed
+        buf = buf[consumed:]
+        if eof:
+            break
+
+    if header["body_offset"] is None:
+        raise ValueError("Missing $enddefinitions; not a complete VCD header")
+    if root["vars"]:
+        # Declarations outside any $scope
+        header["scopes"].insert(0, {"name": "", "type": "root", "scopes": [], "vars": root["vars"]})
+    f.seek(header["body_offset"])
+    return header
+
+
+@lru_cache(maxsize=64)
+def _read_header(path: str, size: int, mtime_ns: int) -> dict:
+    with open(path, "rb") as f:
+        return parse_header(f)
+
+
+def read_header(path: Path) -> dict:
+    """
+    Parsed header of the VCD at `path`, cached by (path, size, mtime) so repeated
+    metadata lookups on an unchanged file skip the parse entirely.
+    The returned dict is shared between callers and must not be mutated.
+    """
+    st = os.stat(path)
+    return _read_header(str(path), st.st_size, st.st_mtime_ns)
+
+
+def iter_changes(f, offset: int, decoder: VCDChangeDecoder = None):
+    """
+    Yields (time, id_code, value) tuples from the value change section starting at `offset`.
+    Pass a `decoder` to read its `time` afterwards: the last timestamp, which may follow the last change.
+    """
+    f.seek(offset)
+    tokenizer = VCDTokenizer()
+    if decoder is None:
+        decoder = VCDChangeDecoder()
+    while True:
+        chunk = f.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield from decoder.decode(tokenizer.feed(chunk))
+    yield from decoder.decode(tokenizer.flush())
@@ -0,0 +1,95 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.services.vcd_parser import VCDChangeDecoder, VCDTokenizer, parse_header
+
+
+class VCDTail:
+    """
+    Follows a VCD that is still being written. Each poll() decodes only the bytes
+    appended since the previous call and returns the changes of the subscribed
+    signals. A file that shrinks or is replaced (new inode) starts over from the header.
+    """
+
+    def __init__(self, path: Path, names: Optional[list] = None, max_bytes: int = 4 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._names = list(names or [])
+        self._reset()
+
+    def _reset(self):
+        self.header = None
+        self.offset = 0
+        self._inode = None
+        self._tokenizer = VCDTokenizer()
+        self._decoder = VCDChangeDecoder()
+        self._ids = {}
+        self.missing = []
+
+    @property
+    def time(self) -> int:
+        return self._decoder.time
+
+    def subscribe(self, names: list):
+        """Replaces the subscribed signal set; takes effect for bytes decoded from now on."""
+        self._names = list(names)
+        if self.header is not None:
+            self._resolve()
+
+    def _resolve(self):
+        by_name = {v["name"]: v["id"].encode() for v in self.header["vars"]}
+        ids = {}
+        missing = []
+        for name in self._names:
+            ident = by_name.get(name)
+            if ident is None:
+                missing.append(name)
+            else:
+                ids.setdefault(ident, []).append(name)
+        # Swapped in whole: poll() may be running on another thread
+        self._ids, self.missing = ids, missing
+
+    def poll(self) -> dict:
+        """
+        Returns {"reset": bool, "header": bool, "changes": {name: [[t, value], ...]}, "more": bool}.
+        `header` is True on the poll that first parsed the declarations; `more`
+        means the size limit was hit and more appended data is already waiting.
+        """
+        result = {"reset": False, "header": False, "changes": {}, "more": False}
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return result
+        if self._inode is not None and (st.st_ino != self._inode or st.st_size < self.offset):
+            self._reset()
+            result["reset"] = True
+        self._inode = st.st_ino
+
+        with open(self.path, "rb") as f:
+            if self.header is None:
+                try:
+                    self.header = parse_header(f)
+                except ValueError:
+                    return result  # declarations not fully written yet
+                self.offset = self.header["body_offset"]
+                self._resolve()
+                result["header"] = True
+
+            f.seek(self.offset)
+            data = f.read(min(st.st_size - self.offset, self.max_bytes))
+        if not data:
+            return result
+        self.offset += len(data)
+        result["more"] = self.offset < st.st_size
+
+        changes = result["changes"]
+        ids = self._ids
+        for t, ident, value in self._decoder.decode(self._tokenizer.feed(data)):
+            names = ids.get(ident)
+            if names is None:
+                continue
+            point = [t, value.decode(errors="replace")]
+            for name in names:
+                changes.setdefault(name, []).append(point)
+        return result
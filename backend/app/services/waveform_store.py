@@ -0,0 +1,232 @@
+"""
+OWV ("OpenV Waveform"): a compact, block-compressed binary form of a VCD.
+
+Layout (little-endian):
+
+    b"OWV1"
+    block 0 | block 1 | ...           zlib-compressed change blocks
+    directory                         zlib-compressed JSON
+    u64 directory offset | u32 directory length | b"OWV1"
+
+Each block holds up to BLOCK_SIZE consecutive changes of one signal: `count`
+int64 time deltas (the first is 0) followed by the raw VCD values joined by b"\\n".
+The directory records the header (timescale, variables) and, per signal key, a
+list of [t_first, t_last, offset, length, count] block entries sorted by time,
+so a windowed read only inflates the blocks that overlap the window.
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.vcd_index import CACHE_SUBDIR, MAX_BUFFERED, VCDIndexer
+from app.services.vcd_parser import VCDChangeDecoder, parse_header, iter_changes
+
+MAGIC = b"OWV1"
+FORMAT_VERSION = 2
+BLOCK_SIZE = 4096
+_TRAILER = struct.Struct("<QI4s")
+
+
+def convert_vcd(vcd_path: Path, out_path: Path) -> Path:
+    """Streams a VCD into an OWV file; memory stays bounded by MAX_BUFFERED changes."""
+    tmp_path = out_path.with_name(out_path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(vcd_path, "rb") as f, open(tmp_path, "wb") as out:
+            header = parse_header(f)
+            keys = {}
+            for var in header["vars"]:
+                keys.setdefault(var["id"].encode(), len(keys))
+            times = [array("q") for _ in keys]
+            values = [[] for _ in keys]
+            blocks = [[] for _ in keys]
+            out.write(MAGIC)
+
+            def flush(k):
+                t = np.frombuffer(times[k], dtype=np.int64)
+                deltas = np.diff(t, prepend=t[0])
+                payload = zlib.compress(deltas.tobytes() + b"\n".join(values[k]), 6)
+                blocks[k].append([int(t[0]), int(t[-1]), out.tell(), len(payload), len(t)])
+                out.write(payload)
+                times[k] = array("q")
+                values[k] = []
+
+            buffered = 0
+            decoder = VCDChangeDecoder()
+            for t, ident, value in iter_changes(f, header["body_offset"], decoder):
+                k = keys.get(ident)
+                if k is None:
+                    continue
+                times[k].append(t)
+                values[k].append(value)
+                buffered += 1
+                if len(times[k]) >= BLOCK_SIZE:
+                    buffered -= len(times[k])
+                    flush(k)
+                elif buffered >= MAX_BUFFERED:
+                    for j in range(len(keys)):
+                        if times[j]:
+                            flush(j)
+                    buffered = 0
+            for k in range(len(keys)):
+                if times[k]:
+                    flush(k)
+
+            directory = zlib.compress(json.dumps({
+                "version": FORMAT_VERSION,
+                "timescale": header["timescale"],
+                "end_time": decoder.time,
+                "signals": [dict(var, key=keys[var["id"].encode()]) for var in header["vars"]],
+                "blocks": blocks,
+            }).encode())
+            directory_offset = out.tell()
+            out.write(directory)
+            out.write(_TRAILER.pack(directory_offset, len(directory), MAGIC))
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    prefix = out_path.name.split("-", 1)[0]
+    for stale in out_path.parent.glob(f"{prefix}-*.owv"):
+        if stale != out_path:
+            stale.unlink(missing_ok=True)
+    return out_path
+
+
+class OWVReader:
+    """Windowed reads over an OWV file; same query surface as VCDIndex.window()."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            directory_offset, directory_length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an OWV file")
+            f.seek(directory_offset)
+            directory = json.loads(zlib.decompress(f.read(directory_length)))
+        self.timescale = directory["timescale"]
+        self.end_time = directory["end_time"]
+        self.signals = {s["name"]: s for s in directory["signals"]}
+        self._blocks = directory["blocks"]
+        self._firsts = [[b[0] for b in blocks] for blocks in self._blocks]
+
+    def _read_blocks(self, k: int, first: int, last: int):
+        times = []
+        values = []
+        with open(self.path, "rb") as f:
+            for t_first, _, offset, length, count in self._blocks[k][first:last]:
+                f.seek(offset)
+                payload = zlib.decompress(f.read(length))
+                deltas = np.frombuffer(payload, dtype=np.int64, count=count)
+                times.append(t_first + np.cumsum(deltas))
+                values.extend(payload[count * 8:].split(b"\n"))
+        t = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+        return t, values
+
+    def window(self, name: str, t0: int, t1: int) -> list:
+        """Value changes of `name` in [t0, t1], led by the value in effect at t0."""
+        k = self.signals[name]["key"]
+        firsts = self._firsts[k]
+        first = max(bisect_right(firsts, t0) - 1, 0)
+        last = bisect_right(firsts, t1)
+        t, v = self._read_blocks(k, first, last)
+        lo = max(int(np.searchsorted(t, t0, side="right")) - 1, 0)
+        hi = int(np.searchsorted(t, t1, side="right"))
+        return [[int(ts), val.decode(errors="replace")] for ts, val in zip(t[lo:hi], v[lo:hi])]
+
+
+@lru_cache(maxsize=32)
+def _open_reader(path: str) -> OWVReader:
+    return OWVReader(Path(path))
+
+
+class WaveformConverter:
+    """
+    Converts project VCDs to OWV in the background. Outputs live in the index cache
+    directory and are keyed by source path, mtime and size like index sidecars.
+    """
+
+    def __init__(self, max_workers: int = 1, settle_seconds: float = 5.0):
+        self.settle_seconds = settle_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vcd-convert")
+        self._pending = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def output_path(project_path: Path, vcd_path: Path, st=None) -> Path:
+        sidecar = VCDIndexer.sidecar_path(project_path, vcd_path, st)
+        key = sidecar.name.rsplit("-v", 1)[0]
+        return project_path / CACHE_SUBDIR / f"{key}-f{FORMAT_VERSION}.owv"
+
+    def submit(self, project_path: Path, vcd_path: Path) -> Future:
+        out_path = self.output_path(project_path, vcd_path)
+        with self._lock:
+            future = self._pending.get(out_path)
+            if future is not None:
+                return future
+            if out_path.exists():
+                future = Future()
+                future.set_result(out_path)
+                return future
+            if out_path in self._failed:
+                future = Future()
+                future.set_exception(ValueError(f"Conversion of {vcd_path.name} previously failed"))
+                return future
+            future = self._executor.submit(convert_vcd, vcd_path, out_path)
+            self._pending[out_path] = future
+        future.add_done_callback(lambda done: self._forget(out_path, done))
+        return future
+
+    def _forget(self, out_path: Path, future: Future):
+        with self._lock:
+            if self._pending.get(out_path) is future:
+                del self._pending[out_path]
+            if future.exception() is not None:
+                # Don't retry a broken dump on every manifest refresh; a new mtime gets a new key
+                self._failed.add(out_path)
+
+    def reader(self, project_path: Path, vcd_path: Path):
+        """Returns an OWVReader if an up-to-date conversion exists, else None."""
+        out_path = self.output_path(project_path, vcd_path)
+        if not out_path.exists():
+            return None
+        return _open_reader(str(out_path))
+
+    def on_manifest_refresh(self, manifest):
+        """Manifest listener: converts VCDs that appeared or changed once they stop growing."""
+        now = time.time()
+        for entry in manifest.list((".vcd",)):
+            if now - entry["mtime"] < self.settle_seconds:
+                continue
+            try:
+                self.submit(manifest.root, manifest.root / entry["path"])
+            except OSError:
+                pass  # removed since the refresh; the next one drops it
+
+
+# Singleton instance for the service
+_converter = None
+
+def get_waveform_converter() -> WaveformConverter:
+    global _converter
+    if _converter is None:
+        settings = get_settings()
+        _converter = WaveformConverter(
+            max_workers=settings.VCD_CONVERT_WORKERS,
+            settle_seconds=settings.VCD_CONVERT_SETTLE_SECONDS
+        )
+    return _converter
@@ -0,0 +1,211 @@
+import pytest
+from unittest.mock import MagicMock
+from pathlib import Path
+from app.config import get_settings
+from tests.unit.test_vcd_index import SAMPLE_VCD
+
+@pytest.fixture
+def vcd_project(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "DOCKER_BASE_PATH", str(tmp_path))
+    client.post("/auth/register", json={"email": "wave@example.com", "password": "password", "username": "waveuser"})
+    login_res = client.post("/auth/login", data={"username": "wave@example.com", "password": "password"})
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+    project = client.post("/projects/", json={"name": "Wave Proj"}, headers=headers).json()
+
+    project_path = tmp_path / str(project["user_id"]) / str(project["id"])
+    (project_path / "sim_build").mkdir(parents=True)
+    (project_path / "sim_build" / "dump.vcd").write_bytes(SAMPLE_VCD)
+    return project["id"], headers
+
+def test_list_vcd_files(client, vcd_project):
+    project_id, headers = vcd_project
+    res = client.get(f"/vcd/{project_id}/list", headers=headers)
+    assert res.status_code == 200
+    [entry] = res.json()
+    assert (entry["name"], entry["path"], entry["size"]) == ("dump.vcd", "sim_build/dump.vcd", len(SAMPLE_VCD))
+
+    res = client.get(f"/vcd/{project_id}/list", params={"min_size": len(SAMPLE_VCD) + 1}, headers=headers)
+    assert res.json() == []
+
+@pytest.mark.parametrize("convert_binary, warmed", [(False, 1), (True, 0)])
+def test_list_warms_index_only_without_binary_conversion(client, vcd_project, monkeypatch, convert_binary, warmed):
+    from app.routers import vcd as vcd_router
+    project_id, headers = vcd_project
+    indexer = MagicMock()
+    monkeypatch.setattr(vcd_router, "get_vcd_indexer", lambda: indexer)
+    monkeypatch.setattr(get_settings(), "VCD_INDEX_SETTLE_SECONDS", 0)
+    monkeypatch.setattr(get_settings(), "VCD_CONVERT_BINARY", convert_binary)
+
+    res = client.get(f"/vcd/{project_id}/list", headers=headers)
+    assert res.status_code == 200
+    assert indexer.submit.call_count == warmed
+
+def test_get_vcd_metadata(client, vcd_project):
+    project_id, headers = vcd_project
+    res = client.get(f"/vcd/{project_id}/metadata", params={"filename": "sim_build/dump.vcd"}, headers=headers)
+    assert res.status_code == 200
+    data = res.json()
+    assert data["timescale"] == "1ns"
+    assert [s["name"] for s in data["signals"]] == ["top.clk", "top.data", "top.sub.en"]
+    assert data["scopes"][0]["scopes"][0]["name"] == "sub"
+
+def test_get_vcd_signals_window(client, vcd_project):
+    project_id, headers = vcd_project
+    res = client.get(
+        f"/vcd/{project_id}/signals",
+        params={"filename": "sim_build/dump.vcd", "names": "top.clk,top.sub.en,top.nope", "t0": 12, "t1": 20},
+        headers=headers
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["timescale"] == "1ns"
+    assert data["signals"]["top.clk"] == [[10, "0"], [15, "1"], [20, "0"]]
+    assert data["signals"]["top.sub.en"] == [[10, "1"]]
+    assert data["missing"] == ["top.nope"]
+
+def test_vcd_path_traversal_denied(client, vcd_project):
+    project_id, headers = vcd_project
+    res = client.get(f"/vcd/{project_id}/signals", params={"filename": "../../x.vcd", "names": "a"}, headers=headers)
+    assert res.status_code == 403
+
+def test_get_vcd_overview(client, vcd_project):
+    project_id, headers = vcd_project
+    res = client.get(
+        f"/vcd/{project_id}/overview",
+        params={"filename": "sim_build/dump.vcd", "names": "top.clk", "width": 2},
+        headers=headers
+    )
+    assert res.status_code == 200
+    view = res.json()["signals"]["top.clk"]
+    assert view["mode"] == "lod"
+    assert len(view["points"]) <= 3
+
+def test_stream_vcd_range_and_conditional(client, vcd_project):
+    project_id, headers = vcd_project
+    params = {"filename": "sim_build/dump.vcd"}
+
+    full = client.get(f"/vcd/{project_id}/stream", params=params, headers=headers)
+    assert full.status_code == 200
+    assert full.content == SAMPLE_VCD
+    assert full.headers["accept-ranges"] == "bytes"
+    etag = full.headers["etag"]
+
+    partial = client.get(f"/vcd/{project_id}/stream", params=params, headers={**headers, "Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == SAMPLE_VCD[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(SAMPLE_VCD)}"
+
+    cached = client.get(f"/vcd/{project_id}/stream", params=params, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    since = client.get(
+        f"/vcd/{project_id}/stream", params=params,
+        headers={**headers, "If-Modified-Since": full.headers["last-modified"]}
+    )
+    assert since.status_code == 304
+
+@pytest.mark.parametrize("settle, submitted", [(3600, 0), (0, 1)])
+def test_stream_vcd_compresses_only_settled_dumps(client, vcd_project, monkeypatch, settle, submitted):
+    from app.routers import vcd as vcd_router
+    project_id, headers = vcd_project
+    compressor = MagicMock()
+    compressor.fresh_artifact.return_value = None
+    monkeypatch.setattr(vcd_router, "get_waveform_compressor", lambda: compressor)
+    monkeypatch.setattr(get_settings(), "VCD_COMPRESS_MIN_SIZE", 0)
+    monkeypatch.setattr(get_settings(), "VCD_COMPRESS_SETTLE_SECONDS", settle)
+
+    res = client.get(f"/vcd/{project_id}/stream", params={"filename": "sim_build/dump.vcd"}, headers={**headers, "Accept-Encoding": "gzip"})
+    assert res.content == SAMPLE_VCD
+    assert compressor.submit.call_count == submitted
+
+def test_stream_vcd_compressed_after_background_build(client, vcd_project, monkeypatch):
+    from app.services.vcd_compression import get_waveform_compressor
+    project_id, headers = vcd_project
+    monkeypatch.setattr(get_settings(), "VCD_COMPRESS_MIN_SIZE", 0)
+    params = {"filename": "sim_build/dump.vcd"}
+    gzip_headers = {**headers, "Accept-Encoding": "gzip"}
+
+    first = client.get(f"/vcd/{project_id}/stream", params=params, headers=gzip_headers)
+    assert "content-encoding" not in first.headers
+    assert "Accept-Encoding" in first.headers["vary"]
+
+    compressor = get_waveform_compressor()
+    vcd_path = next(Path(get_settings().DOCKER_BASE_PATH).rglob("dump.vcd"))
+    compressor.submit(vcd_path, "gzip").result(timeout=10)
+
+    second = client.get(f"/vcd/{project_id}/stream", params=params, headers=gzip_headers)
+    assert second.headers["content-encoding"] == "gzip"
+    assert second.content == SAMPLE_VCD
+    assert second.headers["etag"] != first.headers["etag"]
+
+    # Rewriting the source invalidates the cached artifact
+    vcd_path.write_bytes(SAMPLE_VCD + b"#30\n")
+    third = client.get(f"/vcd/{project_id}/stream", params=params, headers=gzip_headers)
+    assert "content-encoding" not in third.headers
+
+def test_tail_vcd_websocket(client, vcd_project):
+    project_id, headers = vcd_project
+    token = headers["Authorization"].split()[1]
+    url = f"/vcd/{project_id}/tail?token={token}&filename=sim_build/dump.vcd&names=top.clk"
+    with client.websocket_connect(url) as ws:
+        header = ws.receive_json()
+        assert header == {"type": "header", "timescale": "1ns", "missing": []}
+        changes = ws.receive_json()
+        assert changes["type"] == "changes"
+        assert changes["signals"]["top.clk"][-1] == [20, "0"]
+
+        ws.send_json({"subscribe": ["top.sub.en", "top.nope"]})
+        assert ws.receive_json()["missing"] == ["top.nope"]
+
+def test_tail_vcd_websocket_rejects_bad_token(client, vcd_project):
+    project_id, _ = vcd_project
+    with pytest.raises(Exception):
+        with client.websocket_connect(f"/vcd/{project_id}/tail?token=bad&filename=sim_build/dump.vcd") as ws:
+            ws.receive_json()
+
+def test_search_vcd_signals(client, vcd_project):
+    project_id, headers = vcd_project
+    res = client.get(
+        f"/vcd/{project_id}/search",
+        params={"filename": "sim_build/dump.vcd", "q": "top.*", "mode": "glob", "limit": 2},
+        headers=headers
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["total"] == 3
+    assert [s["name"] for s in data["results"]] == ["top.clk", "top.data"]
+
+    res = client.get(f"/vcd/{project_id}/search", params={"filename": "sim_build/dump.vcd", "q": "x", "mode": "regex"}, headers=headers)
+    assert res.status_code == 400
+
+def test_get_vcd_activity_top_n(client, vcd_project):
+    project_id, headers = vcd_project
+    res = client.get(f"/vcd/{project_id}/activity", params={"filename": "sim_build/dump.vcd", "top": 2}, headers=headers)
+    assert res.status_code == 200
+    stats = res.json()["signals"]
+    assert [s["name"] for s in stats] == ["top.clk", "top.data"]
+    assert stats[0]["toggles"] == 4
+
+def test_diff_vcd_runs(client, vcd_project, tmp_path):
+    project_id, headers = vcd_project
+    [project_path] = tmp_path.glob(f"*/{project_id}")
+    (project_path / "sim_build" / "rerun.vcd").write_bytes(SAMPLE_VCD.replace(b"#15\n1!", b"#15\n0!"))
+
+    res = client.get(
+        f"/vcd/{project_id}/diff",
+        params={"filename": "sim_build/dump.vcd", "other": "sim_build/rerun.vcd"},
+        headers=headers
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["first_divergence"] == 15
+    assert data["divergent"] == [{"name": "top.clk", "time": 15, "a": "1", "b": "0"}]
+    assert data["compared"] == 3
+
+    res = client.get(
+        f"/vcd/{project_id}/diff",
+        params={"filename": "sim_build/dump.vcd", "other": "sim_build/dump.vcd"},
+        headers=headers
+    )
+    assert res.json()["divergent"] == []
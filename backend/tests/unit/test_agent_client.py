@@ -0,0 +1,126 @@
+import json
+import socketserver
+import threading
+import pytest
+from unittest.mock import MagicMock
+from app.services.agent_client import AgentClient, AgentToolError, AgentUnavailable
+from app.services.ai_agent import AIAgentService
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        for line in self.rfile:
+            request = json.loads(line)
+            if request["tool"] == "openv_get_status":
+                reply = {"id": request["id"], "ok": True, "result": {"state": "IDLE", "args": request["args"]}}
+            else:
+                reply = {"id": request["id"], "ok": False, "error": f"ValueError: Unknown tool: {request['tool']}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+@pytest.fixture
+def agent_socket(tmp_path):
+    path = str(tmp_path / "agent.sock")
+    server = socketserver.ThreadingUnixStreamServer(path, _AgentHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield path, server
+    server.shutdown()
+    server.server_close()
+
+def test_agent_client_reuses_pooled_connection(agent_socket):
+    path, server = agent_socket
+    client = AgentClient(pool_size=1)
+
+    assert client.call(path, "openv_get_status", {"x": 1}) == {"state": "IDLE", "args": {"x": 1}}
+    assert client.call(path, "openv_get_status")["state"] == "IDLE"
+    assert server.connections == 1
+
+    with pytest.raises(AgentToolError, match="Unknown tool"):
+        client.call(path, "openv_nope")
+    # A tool error is an ordinary reply, so the connection stays pooled
+    client.call(path, "openv_get_status")
+    assert server.connections == 1
+
+def test_agent_client_waits_longer_than_the_tool_limit():
+    client = AgentClient(timeout_margin=60)
+    assert client.call_timeout("openv_run_sim") == 3660
+    assert client.call_timeout("openv_run_pipeline") > client.call_timeout("openv_run_sim")
+    assert client.call_timeout("openv_future_tool") == client.call_timeout("openv_run_pipeline")
+
+def test_agent_client_unavailable_without_socket(tmp_path):
+    client = AgentClient()
+    with pytest.raises(AgentUnavailable):
+        client.call(str(tmp_path / "missing.sock"), "openv_get_status")
+
+def test_agent_client_rejects_symlinked_socket(agent_socket, tmp_path):
+    path, server = agent_socket
+    link = tmp_path / "link.sock"
+    link.symlink_to(path)
+    (tmp_path / "file.sock").write_text("")
+    client = AgentClient()
+
+    with pytest.raises(AgentUnavailable, match="not a socket"):
+        client.call(str(link), "openv_get_status")
+    with pytest.raises(AgentUnavailable, match="not a socket"):
+        client.call(str(tmp_path / "file.sock"), "openv_get_status")
+    assert server.connections == 0
+
+class _GarbageHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            self.server.connections += 1
+            self.wfile.write(self.server.replies.pop(0) + b"\n")
+
+def test_agent_client_malformed_reply_raises_tool_error(tmp_path):
+    path = str(tmp_path / "agent.sock")
+    server = socketserver.ThreadingUnixStreamServer(path, _GarbageHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.replies = [b"not json", b"\xff\xfe", b"[1, 2]"]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = AgentClient(pool_size=1)
+        for _ in range(3):
+            with pytest.raises(AgentToolError, match="Malformed agent reply"):
+                client.call(path, "openv_get_status")
+        # A desynchronised connection is never returned to the pool
+        assert client._idle[path] == []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_slash_command_uses_agent_and_falls_back_to_exec(tmp_path):
+    session = MagicMock()
+    session.get.return_value = MagicMock(id=7, user_id=3)
+    container_manager = MagicMock()
+    container_manager.agent_socket_path.return_value = str(tmp_path / "agent.sock")
+    container_manager.exec_command.return_value = "sim output"
+    agent_client = MagicMock()
+    service = AIAgentService(container_manager, agent_client=agent_client)
+
+    agent_client.call.return_value = "All tests passed"
+    result = service.process_slash_command("cid", "/fix-unit", session, 7)
+    assert result == {"status": "success", "output": "All tests passed"}
+    agent_client.call.assert_called_with(str(tmp_path / "agent.sock"), "openv_run_sim", {"test_path": "test/"})
+    container_manager.exec_command.assert_not_called()
+
+    agent_client.call.side_effect = AgentUnavailable("no socket")
+    result = service.process_slash_command("cid", "/fix-unit", session, 7)
+    assert result == {"status": "success", "output": "sim output"}
+    cli_call, start_call = container_manager.exec_command.call_args_list
+    assert cli_call.args == ("cid", "python3 mcp_server.py --tool openv_run_sim --args '{\"test_path\": \"test/\"}'")
+    assert start_call.kwargs == {"detach": True}
+
+def test_pipeline_slash_command_passes_target(tmp_path):
+    session = MagicMock()
+    session.get.return_value = MagicMock(id=7, user_id=3)
+    container_manager = MagicMock()
+    container_manager.agent_socket_path.return_value = str(tmp_path / "agent.sock")
+    agent_client = MagicMock()
+    agent_client.call.return_value = {"target": "sta", "state": "SYNTHESIZED", "stages": []}
+    service = AIAgentService(container_manager, agent_client=agent_client)
+
+    result = service.process_slash_command("cid", "/pipeline timed", session, 7)
+    agent_client.call.assert_called_with(str(tmp_path / "agent.sock"), "openv_run_pipeline", {"target": "TIMED"})
+    assert result["status"] == "success" and '"state": "SYNTHESIZED"' in result["output"]
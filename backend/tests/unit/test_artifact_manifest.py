@@ -0,0 +1,76 @@
+import os
+from app.services.artifact_manifest import ProjectManifest, ArtifactManifestService
+
+def test_manifest_tracks_artifacts_incrementally(tmp_path):
+    (tmp_path / "sim_build").mkdir()
+    (tmp_path / "sim_build" / "dump.vcd").write_bytes(b"x" * 10)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "top.v").write_text("module top; endmodule")
+    (tmp_path / ".openv" / "cache").mkdir(parents=True)
+    (tmp_path / ".openv" / "cache" / "old.vcd").write_bytes(b"")
+
+    manifest = ProjectManifest(tmp_path)
+    manifest.refresh()
+    assert [f["path"] for f in manifest.list()] == ["sim_build/dump.vcd"]
+
+    # New file, removed directory and a growing dump are all picked up
+    (tmp_path / "sim.log").write_text("log")
+    (tmp_path / "sim_build" / "dump.vcd").write_bytes(b"x" * 20)
+    manifest.refresh()
+    assert {f["path"]: f["size"] for f in manifest.list()} == {"sim.log": 3, "sim_build/dump.vcd": 20}
+
+    for name in os.listdir(tmp_path / "sim_build"):
+        os.remove(tmp_path / "sim_build" / name)
+    os.rmdir(tmp_path / "sim_build")
+    manifest.refresh()
+    assert [f["path"] for f in manifest.list()] == ["sim.log"]
+
+def test_manifest_filters(tmp_path):
+    for i, (name, size) in enumerate([("a.vcd", 5), ("b.vcd", 50), ("run.log", 500)]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    manifest = ProjectManifest(tmp_path)
+    manifest.refresh()
+    assert [f["name"] for f in manifest.list((".vcd",))] == ["a.vcd", "b.vcd"]
+    assert [f["name"] for f in manifest.list(min_size=10)] == ["b.vcd", "run.log"]
+    assert [f["name"] for f in manifest.list(newest_first=True)] == ["run.log", "b.vcd", "a.vcd"]
+
+def test_service_serves_from_memory_within_ttl(tmp_path):
+    service = ArtifactManifestService(ttl=60)
+    manifest = service.get(tmp_path)
+    assert manifest.list() == []
+    (tmp_path / "late.vcd").write_bytes(b"")
+    assert service.get(tmp_path).list() == []
+
+def test_list_while_refreshing(tmp_path):
+    import sys
+    import threading
+    for i in range(2000):
+        (tmp_path / f"keep{i}.log").write_text("x")
+    manifest = ProjectManifest(tmp_path)
+    manifest.refresh()
+    stop = threading.Event()
+
+    def churn():
+        # Adding and removing entries changes the dict size under a concurrent list()
+        i = 0
+        while not stop.is_set():
+            (tmp_path / f"run{i}.log").write_text("x")
+            (tmp_path / f"run{i - 1}.log").unlink(missing_ok=True)
+            manifest.refresh()
+            i += 1
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    worker = threading.Thread(target=churn)
+    worker.start()
+    try:
+        for _ in range(300):
+            manifest.list(min_size=1)
+    finally:
+        stop.set()
+        worker.join()
+        sys.setswitchinterval(interval)
+    assert len(manifest.list()) == 2001
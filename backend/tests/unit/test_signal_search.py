@@ -0,0 +1,34 @@
+import pytest
+from app.services.signal_search import SignalNameIndex, glob_to_regex
+import re
+
+NAMES = ["soc.cpu.alu.result", "soc.cpu.alu.valid", "soc.cpu.Valid_q", "soc.dma.valid", "soc.dma.ready", "tb.clk"]
+
+@pytest.fixture
+def index():
+    return SignalNameIndex([{"name": n, "type": "wire", "width": 1, "id": str(i)} for i, n in enumerate(NAMES)])
+
+def names(result):
+    return [v["name"] for v in result["results"]]
+
+def test_prefix(index):
+    assert names(index.search("soc.cpu.", "prefix")) == ["soc.cpu.alu.result", "soc.cpu.alu.valid", "soc.cpu.Valid_q"]
+    assert index.search("SOC.", "prefix")["total"] == 5
+    assert index.search("SOC.", "prefix", ignore_case=False)["total"] == 0
+
+def test_substring_and_case(index):
+    assert names(index.search("valid")) == ["soc.cpu.alu.valid", "soc.cpu.Valid_q", "soc.dma.valid"]
+    assert names(index.search("Valid", ignore_case=False)) == ["soc.cpu.Valid_q"]
+
+def test_glob(index):
+    assert names(index.search("soc.*.valid", "glob")) == ["soc.cpu.alu.valid", "soc.dma.valid"]
+    assert names(index.search("soc.dma.[!v]*", "glob")) == ["soc.dma.ready"]
+    assert names(index.search("*.cl?", "glob")) == ["tb.clk"]
+
+def test_pagination(index):
+    page = index.search("soc", "substring", offset=2, limit=2)
+    assert page["total"] == 5
+    assert names(page) == ["soc.cpu.Valid_q", "soc.dma.ready"]
+
+def test_glob_star_does_not_cross_names():
+    assert not re.search(glob_to_regex("a*b"), "a\nb", re.MULTILINE)
@@ -0,0 +1,62 @@
+import numpy as np
+from app.services.vcd_diff import diff_indexes, first_divergence
+from app.services.vcd_index import VCDIndex, build_index
+from tests.unit.test_vcd_index import SAMPLE_VCD
+
+def stream(times, values):
+    raw = np.array(values, dtype=bytes)
+    numeric = np.array([float(int(v, 2)) if set(v) <= {"0", "1"} else np.nan for v in values])
+    return np.array(times, dtype=np.int64), raw, numeric
+
+def test_first_divergence():
+    a = stream([0, 10, 20], ["0", "1", "0"])
+    assert first_divergence(a, stream([0, 10, 20], ["0", "1", "0"]), 0, 100) is None
+    assert first_divergence(a, stream([0, 10, 25], ["0", "1", "0"]), 0, 100) == (20, "0", "1")
+    assert first_divergence(a, stream([0, 12], ["0", "1"]), 0, 100) == (10, "1", "0")
+    # Outside the window nothing counts
+    assert first_divergence(a, stream([0, 10, 25], ["0", "1", "0"]), 0, 19) is None
+
+def test_first_divergence_normalises_vectors():
+    a = stream([0, 5], ["0010", "x1"])
+    assert first_divergence(a, stream([0, 5], ["10", "x1"]), 0, 10) is None
+    assert first_divergence(a, stream([0, 5], ["10", "01"]), 0, 10) == (5, "x1", "01")
+
+def test_first_divergence_wide_vectors():
+    top = "1" + "0" * 63
+    a = stream([0], [top])
+    assert first_divergence(a, stream([0], [top[:-1] + "1"]), 0, 10) == (0, top, top[:-1] + "1")
+    assert first_divergence(a, stream([0], ["000" + top]), 0, 10) is None
+
+def test_first_divergence_reals():
+    a = (np.array([0], dtype=np.int64), np.array([b"1.50"]), np.array([1.5]))
+    b = (np.array([0], dtype=np.int64), np.array([b"1.5"]), np.array([1.5]))
+    assert first_divergence(a, b, 0, 10, is_real=True) is None
+
+def test_diff_indexes(tmp_path):
+    a_path = tmp_path / "a.vcd"
+    b_path = tmp_path / "b.vcd"
+    a_path.write_bytes(SAMPLE_VCD)
+    b_path.write_bytes(SAMPLE_VCD.replace(b"#15\n1!", b"#15\n0!").replace(b"$var reg 1 # en $end", b"$var reg 1 # en2 $end"))
+    a = VCDIndex(build_index(a_path, tmp_path / "a-1-1.npz"))
+    b = VCDIndex(build_index(b_path, tmp_path / "b-1-1.npz"))
+
+    result = diff_indexes(a, b)
+    assert result["divergent"] == [{"name": "top.clk", "time": 15, "a": "1", "b": "0"}]
+    assert result["first_divergence"] == 15
+    assert result["only_in_a"] == ["top.sub.en"]
+    assert result["only_in_b"] == ["top.sub.en2"]
+    assert result["compared"] == 2
+    assert not result["truncated"]
+
+def test_diff_stops_early(tmp_path):
+    a_path = tmp_path / "a.vcd"
+    b_path = tmp_path / "b.vcd"
+    a_path.write_bytes(SAMPLE_VCD)
+    b_path.write_bytes(SAMPLE_VCD.replace(b"b1010", b"b1011").replace(b"#15\n1!", b"#15\n0!"))
+    a = VCDIndex(build_index(a_path, tmp_path / "a-1-1.npz"))
+    b = VCDIndex(build_index(b_path, tmp_path / "b-1-1.npz"))
+
+    result = diff_indexes(a, b, max_divergences=1)
+    assert len(result["divergent"]) == 1
+    assert result["truncated"]
+    assert result["first_divergence"] is None
@@ -0,0 +1,189 @@
+import asyncio
+import pytest
+from app.services.vcd_parser import parse_header, read_header, iter_changes, VCDTokenizer, VCDChangeDecoder
+import numpy as np
+from app.services.vcd_index import VCDIndexer, VCDIndex, build_index, build_pyramid
+
+SAMPLE_VCD = b"""$date today $end
+$version test $end
+$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 8 " data [7:0] $end
+$scope module sub $end
+$var reg 1 # en $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+$dumpvars
+0!
+b0 "
+x#
+$end
+#5
+1!
+#10
+0!
+b1010 "
+1#
+#15
+1!
+$comment mid-dump note $end
+#20
+0!
+bx1 "
+"""
+
+@pytest.fixture
+def vcd_file(tmp_path):
+    path = tmp_path / "dump.vcd"
+    path.write_bytes(SAMPLE_VCD)
+    return path
+
+def test_parse_header(vcd_file):
+    with open(vcd_file, "rb") as f:
+        header = parse_header(f)
+        assert f.tell() == header["body_offset"]
+    assert header["timescale"] == "1ns"
+    names = [v["name"] for v in header["vars"]]
+    assert names == ["top.clk", "top.data", "top.sub.en"]
+    assert header["vars"][1]["width"] == 8
+    assert header["vars"][1]["range"] == "[7:0]"
+
+def test_parse_header_scope_tree(vcd_file):
+    with open(vcd_file, "rb") as f:
+        header = parse_header(f)
+    [top] = header["scopes"]
+    assert (top["name"], top["type"]) == ("top", "module")
+    assert [v["name"] for v in top["vars"]] == ["clk", "data"]
+    [sub] = top["scopes"]
+    assert sub["vars"] == [{"name": "en", "type": "reg", "width": 1, "id": "#", "range": None}]
+
+def test_read_header_is_cached_until_file_changes(vcd_file):
+    first = read_header(vcd_file)
+    assert read_header(vcd_file) is first
+    vcd_file.write_bytes(SAMPLE_VCD.replace(b"1ns", b"10ps"))
+    assert read_header(vcd_file)["timescale"] == "10ps"
+
+def test_iter_changes(vcd_file):
+    with open(vcd_file, "rb") as f:
+        header = parse_header(f)
+        changes = list(iter_changes(f, header["body_offset"]))
+    assert changes[0] == (0, b"!", b"0")
+    assert (10, b'"', b"1010") in changes
+    assert changes[-1] == (20, b'"', b"x1")
+
+def test_decoder_handles_split_chunks():
+    tokenizer = VCDTokenizer()
+    decoder = VCDChangeDecoder()
+    changes = []
+    for chunk in (b"#1", b"0 1", b"! b1", b"01 \"\n#2", b"0 0!"):
+        changes += decoder.decode(tokenizer.feed(chunk))
+    changes += decoder.decode(tokenizer.flush())
+    assert changes == [(10, b"!", b"1"), (10, b'"', b"101"), (20, b"!", b"0")]
+
+def test_build_index_window(vcd_file, tmp_path):
+    sidecar = build_index(vcd_file, tmp_path / "cache" / "abc-1-2.npz")
+    index = VCDIndex(sidecar)
+    assert index.end_time == 20
+    # The first point is the value in effect at the window start
+    assert index.window("top.clk", 7, 15) == [[5, "1"], [10, "0"], [15, "1"]]
+    assert index.window("top.data", 0, 20) == [[0, "0"], [10, "1010"], [20, "x1"]]
+    _, _, numeric = index.arrays("top.data")
+    assert numeric[1] == 10
+
+def test_build_index_spills_in_chunks(vcd_file, tmp_path, monkeypatch):
+    import app.services.vcd_index as vcd_index
+    whole = VCDIndex(build_index(vcd_file, tmp_path / "whole" / "abc-1-2.npz"))
+    monkeypatch.setattr(vcd_index, "MAX_BUFFERED", 2)
+    chunked = VCDIndex(build_index(vcd_file, tmp_path / "chunked" / "abc-1-2.npz"))
+    for name in whole.signals:
+        assert chunked.window(name, 0, 20) == whole.window(name, 0, 20)
+    assert chunked.end_time == whole.end_time
+    assert list((tmp_path / "chunked").iterdir()) == [tmp_path / "chunked" / "abc-1-2.npz"]
+
+def test_build_index_ends_at_last_timestamp(tmp_path):
+    vcd = tmp_path / "idle.vcd"
+    vcd.write_bytes(SAMPLE_VCD + b"#35\n")
+    index = VCDIndex(build_index(vcd, tmp_path / "idle-1-1.npz"))
+    assert index.end_time == 35
+    # The trailing idle interval counts towards the default window
+    assert index.activity("top.clk", 0, index.end_time)["duty_cycle"] == 10 / 35
+
+def test_indexer_rebuilds_on_change(tmp_path, vcd_file):
+    indexer = VCDIndexer(max_workers=1)
+    index = asyncio.run(indexer.get_index(tmp_path, vcd_file))
+    assert index.window("top.sub.en", 0, 5) == [[0, "x"]]
+
+    first = VCDIndexer.sidecar_path(tmp_path, vcd_file)
+    vcd_file.write_bytes(SAMPLE_VCD + b"#30\n1!\n")
+    index = asyncio.run(indexer.get_index(tmp_path, vcd_file))
+    assert index.end_time == 30
+    assert not first.exists()
+
+def test_build_pyramid_matches_brute_force():
+    rng = np.random.default_rng(0)
+    t = np.sort(rng.choice(10_000, size=2_000, replace=False)).astype(np.int64)
+    n = rng.integers(0, 256, size=len(t)).astype(np.float64)
+    pyramid, levels = build_pyramid(t, n)
+    # Every stored level at least halves the one before, so the pyramid never outgrows the changes
+    sizes = np.diff(levels[:, 1])
+    assert np.all(2 * sizes <= np.r_[len(t), sizes[:-1]])
+    assert len(pyramid) <= len(t)
+
+    for (level, start), (_, end) in zip(levels[:-1], levels[1:]):
+        rows = pyramid[start:end]
+        for row in rows[:50]:
+            lo, hi = row["bucket"] << level, ((row["bucket"] + 1) << level) - 1
+            inside = (t >= lo) & (t <= hi)
+            first = int(np.argmax(inside))
+            vals = n[max(first - 1, 0):first + inside.sum()]
+            assert row["count"] == inside.sum()
+            assert row["min"] == vals.min() and row["max"] == vals.max()
+            assert row["last"] == n[inside][-1]
+
+def test_overview_is_bounded_by_width(tmp_path):
+    lines = [b"$timescale 1ps $end", b"$scope module top $end", b"$var wire 4 ! bus [3:0] $end",
+             b"$upscope $end", b"$enddefinitions $end"]
+    for i in range(20_000):
+        lines.append(b"#%d" % (i * 3))
+        lines.append(b"b" + format(i % 16, "b").encode() + b" !")
+    path = tmp_path / "long.vcd"
+    path.write_bytes(b"\n".join(lines) + b"\n")
+    index = VCDIndex(build_index(path, tmp_path / "long-1-1.npz"))
+
+    view = index.overview("top.bus", 0, index.end_time, 100)
+    assert view["mode"] == "lod"
+    assert len(view["points"]) <= 101
+    assert sum(p[3] for p in view["points"]) == 20_000
+    assert view["points"][0][1] == 0 and view["points"][0][2] == 15
+
+    zoomed = index.overview("top.bus", 300, 330, 100)
+    assert zoomed["mode"] == "raw"
+    assert zoomed["points"][0] == [300, "100"]
+
+def test_activity(vcd_file, tmp_path):
+    index = VCDIndex(build_index(vcd_file, tmp_path / "act-1-1.npz"))
+    clk = index.activity("top.clk", 0, 20)
+    assert clk["toggles"] == 4
+    assert (clk["first_transition"], clk["last_transition"]) == (5, 20)
+    assert clk["duty_cycle"] == 0.5
+    assert clk["unknown_fraction"] == 0.0
+
+    en = index.activity("top.sub.en", 0, 20)
+    assert en["toggles"] == 1
+    assert en["duty_cycle"] == 0.5
+    assert en["unknown_fraction"] == 0.5
+
+    # Window starting mid-way uses the value carried in from before t0
+    windowed = index.activity("top.clk", 7, 17)
+    assert windowed["toggles"] == 2
+    assert windowed["duty_cycle"] == 0.5
+
+def test_activity_sweep_does_not_cache(vcd_file, tmp_path):
+    index = VCDIndex(build_index(vcd_file, tmp_path / "sweep-1-1.npz"))
+    assert index.activity("top.data", 0, 20, cache=False) == index.activity("top.data", 0, 20)
+    index = VCDIndex(build_index(vcd_file, tmp_path / "sweep-2-2.npz"))
+    for name in index.signals:
+        index.activity(name, 0, 20, cache=False)
+    assert index._loaded == {}
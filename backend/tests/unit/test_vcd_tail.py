@@ -0,0 +1,60 @@
+from app.services.vcd_tail import VCDTail
+from tests.unit.test_vcd_index import SAMPLE_VCD
+
+def test_tail_follows_appended_bytes(tmp_path):
+    path = tmp_path / "live.vcd"
+    header_end = SAMPLE_VCD.index(b"$enddefinitions")
+    path.write_bytes(SAMPLE_VCD[:header_end])
+
+    tail = VCDTail(path, ["top.clk", "top.nope"])
+    assert tail.poll() == {"reset": False, "header": False, "changes": {}, "more": False}
+
+    body_start = SAMPLE_VCD.index(b"#10")
+    path.write_bytes(SAMPLE_VCD[:body_start + 2])  # cut in the middle of "#10"
+    result = tail.poll()
+    assert result["header"]
+    assert tail.missing == ["top.nope"]
+    assert result["changes"] == {"top.clk": [[0, "0"], [5, "1"]]}
+
+    path.write_bytes(SAMPLE_VCD)
+    result = tail.poll()
+    assert result["changes"]["top.clk"] == [[10, "0"], [15, "1"], [20, "0"]]
+    assert tail.time == 20
+    assert tail.poll()["changes"] == {}
+
+def test_tail_resubscribe_and_reset(tmp_path):
+    path = tmp_path / "live.vcd"
+    path.write_bytes(SAMPLE_VCD)
+    tail = VCDTail(path, ["top.clk"])
+    tail.poll()
+
+    tail.subscribe(["top.sub.en"])
+    with open(path, "ab") as f:
+        f.write(b"#25\n0#\n1!\n")
+    assert tail.poll()["changes"] == {"top.sub.en": [[25, "0"]]}
+
+    # A new run truncates the dump
+    path.write_bytes(SAMPLE_VCD[:SAMPLE_VCD.index(b"#5")])
+    result = tail.poll()
+    assert result["reset"] and result["header"]
+    assert result["changes"] == {"top.sub.en": [[0, "x"]]}
+
+def test_tail_respects_max_bytes(tmp_path):
+    path = tmp_path / "live.vcd"
+    path.write_bytes(SAMPLE_VCD)
+    tail = VCDTail(path, ["top.clk"], max_bytes=8)
+    points = []
+    while True:
+        result = tail.poll()
+        points += result["changes"].get("top.clk", [])
+        if not result["more"]:
+            break
+    assert points == [[0, "0"], [5, "1"], [10, "0"], [15, "1"], [20, "0"]]
+
+    # A change without trailing whitespace may still be growing, so it is held back
+    with open(path, "ab") as f:
+        f.write(b"#30\n1!")
+    assert tail.poll()["changes"] == {}
+    with open(path, "ab") as f:
+        f.write(b"\n")
+    assert tail.poll()["changes"] == {"top.clk": [[30, "1"]]}
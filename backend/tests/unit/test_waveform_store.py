@@ -0,0 +1,60 @@
+import os
+import time
+import pytest
+import app.services.waveform_store as waveform_store
+from app.services.waveform_store import OWVReader, WaveformConverter, convert_vcd
+from app.services.artifact_manifest import ProjectManifest
+from app.services.vcd_index import VCDIndex, build_index
+from tests.unit.test_vcd_index import SAMPLE_VCD
+
+def test_owv_round_trip_matches_index(tmp_path):
+    vcd = tmp_path / "dump.vcd"
+    vcd.write_bytes(SAMPLE_VCD)
+    reader = OWVReader(convert_vcd(vcd, tmp_path / "dump-1-1-f1.owv"))
+    index = VCDIndex(build_index(vcd, tmp_path / "dump-1-1-v2.npz"))
+
+    assert reader.timescale == "1ns"
+    assert reader.end_time == 20
+
+    vcd.write_bytes(SAMPLE_VCD + b"#35\n")
+    assert OWVReader(convert_vcd(vcd, tmp_path / "idle-1-1-f1.owv")).end_time == 35
+    for name in index.signals:
+        for t0, t1 in [(0, 20), (7, 15), (12, 12)]:
+            assert reader.window(name, t0, t1) == index.window(name, t0, t1)
+
+def test_owv_reads_only_overlapping_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(waveform_store, "BLOCK_SIZE", 100)
+    lines = [b"$scope module top $end", b"$var wire 1 ! clk $end", b"$upscope $end", b"$enddefinitions $end"]
+    for i in range(1000):
+        lines += [b"#%d" % (i * 10), b"%d!" % (i % 2)]
+    vcd = tmp_path / "long.vcd"
+    vcd.write_bytes(b"\n".join(lines) + b"\n")
+    out = convert_vcd(vcd, tmp_path / "long-1-1-f1.owv")
+    assert out.stat().st_size < vcd.stat().st_size / 4
+
+    reader = OWVReader(out)
+    read = []
+    original = reader._read_blocks
+    monkeypatch.setattr(reader, "_read_blocks", lambda k, a, b: read.append((a, b)) or original(k, a, b))
+    points = reader.window("top.clk", 5005, 5030)
+    assert points == [[5000, "0"], [5010, "1"], [5020, "0"], [5030, "1"]]
+    assert read == [(5, 6)]
+
+def test_converter_follows_manifest(tmp_path):
+    vcd = tmp_path / "sim_build" / "dump.vcd"
+    vcd.parent.mkdir()
+    vcd.write_bytes(SAMPLE_VCD)
+    manifest = ProjectManifest(tmp_path)
+    manifest.refresh()
+
+    converter = WaveformConverter(settle_seconds=60)
+    converter.on_manifest_refresh(manifest)
+    assert converter.reader(tmp_path, vcd) is None  # still considered "growing"
+
+    old = time.time() - 120
+    os.utime(vcd, (old, old))
+    manifest.refresh()
+    converter.settle_seconds = 5
+    converter.on_manifest_refresh(manifest)
+    converter.submit(tmp_path, vcd).result(timeout=10)
+    assert converter.reader(tmp_path, vcd).window("top.sub.en", 0, 20) == [[0, "x"], [10, "1"]]
@@ -0,0 +1,204 @@
+"""
+Benchmarks for the MCP pipeline's own overhead on synthetic RTL projects.
+
+Each project size gets a fresh workspace with generated RTL under src/, cocotb
+tests under tests/ and stub executables standing in for Verible, Verilator,
+Icarus and make, so only mcp_server's work is measured. Every stage reports
+wall time and peak Python allocation (tracemalloc); results are written as JSON.
+
+    python server/benchmarks/bench_pipeline.py --sizes 10 100 1000 10000 --output bench.json
+    python server/benchmarks/bench_pipeline.py --sizes 100 --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import mcp_server  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+STAGES = ("hash_cold", "hash_warm", "lint_cold", "lint_warm", "routing_cold", "routing_warm", "run_sim", "state_load", "state_save")
+STATE_ITERATIONS = 200
+
+STUB_TOOL = """#!/bin/sh
+case "$1" in --version|-V|-version) echo "$(basename "$0") 0.0-bench"; exit 0;; esac
+exit 0
+"""
+STUB_MAKE = """#!/bin/sh
+cat > "${COCOTB_RESULTS_FILE:-results.xml}" <<XML
+<testsuites><testsuite name="bench"><testcase name="test_smoke" time="0.001"/></testsuite></testsuites>
+XML
+echo FAILING_TESTS=0
+"""
+
+
+def generate_project(root: str, files: int):
+    """`files` RTL modules chained by instantiation, one test file per ten modules, and stub tools in bin/."""
+    os.makedirs(os.path.join(root, "src"))
+    os.makedirs(os.path.join(root, "tests"))
+    os.makedirs(os.path.join(root, "bin"))
+    for i in range(files):
+        child = f"    mod_{i - 1} u_child (.clk(clk), .d(q_int), .q(q));\n" if i else "    assign q = q_int;\n"
+        with open(os.path.join(root, "src", f"mod_{i}.v"), "w") as f:
+            f.write(
+                f"module mod_{i} (input clk, input [7:0] d, output [7:0] q);\n"
+                "    reg [7:0] q_int;\n"
+                "    always @(posedge clk) q_int <= d + 8'd1;\n"
+                f"{child}"
+                "endmodule\n"
+            )
+    for i in range(max(1, files // 10)):
+        with open(os.path.join(root, "tests", f"test_mod_{i}.py"), "w") as f:
+            f.write("import cocotb\n\n" + "".join(
+                f"@cocotb.test()\nasync def test_{i}_{n}(dut):\n    await cocotb.triggers.Timer(1)\n\n" for n in range(4)
+            ))
+    with open(os.path.join(root, "Makefile"), "w") as f:
+        f.write(f"TOPLEVEL_LANG = verilog\nTOPLEVEL = mod_{files - 1}\nMODULE = test_mod_0\n")
+
+    for name in ("verible-verilog-lint", "verilator", "iverilog"):
+        _write_executable(os.path.join(root, "bin", name), STUB_TOOL)
+    _write_executable(os.path.join(root, "bin", "make"), STUB_MAKE)
+
+    # Generated files are "old", as in a checked-out project, so the hash cache may keep them
+    past = time.time() - 3600
+    for directory in ("src", "tests"):
+        for name in os.listdir(os.path.join(root, directory)):
+            os.utime(os.path.join(root, directory, name), (past, past))
+
+
+def _write_executable(path: str, content: str):
+    with open(path, "w") as f:
+        f.write(content)
+    os.chmod(path, 0o755)
+
+
+def measure(fn, iterations: int = 1) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    seconds = (time.perf_counter() - start) / iterations
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 6), "peak_bytes": peak}
+
+
+def plan_simulation():
+    rtl = mcp_server.rtl_files()
+    profile = mcp_server.design_profile(rtl)
+    cached = {tool: False for tool in mcp_server.SIM_PRIORS}
+    for tool in mcp_server.SIM_PRIORS:
+        mcp_server.build_fingerprint(tool, rtl)
+    return mcp_server.route_simulator(profile, cached, mcp_server.load_sim_history())
+
+
+def bench_size(files: int, stages: tuple) -> list:
+    root = tempfile.mkdtemp(prefix=f"openv-bench-{files}-")
+    cwd = os.getcwd()
+    path = os.environ["PATH"]
+    try:
+        generate_project(root, files)
+        os.chdir(root)
+        os.environ["PATH"] = f"{os.path.join(root, 'bin')}{os.pathsep}{path}"
+        mcp_server.tool_version.cache_clear()
+        mcp_server._state_store = mcp_server.StateStore(mcp_server.STATE_FILE)
+        mcp_server.save_state(mcp_server.ProjectState(state=mcp_server.State.TEST_LOCKED, top_module=f"mod_{files - 1}"))
+        src_files = mcp_server.rtl_files()
+
+        runners = {
+            "hash_cold": lambda: mcp_server.calculate_hashes("tests"),
+            "hash_warm": lambda: mcp_server.calculate_hashes("tests"),
+            "lint_cold": lambda: asyncio.run(mcp_server.lint(src_files)),
+            "lint_warm": lambda: asyncio.run(mcp_server.lint(src_files)),
+            "routing_cold": plan_simulation,
+            "routing_warm": plan_simulation,
+            "run_sim": lambda: asyncio.run(mcp_server.run_sim("tests")),
+        }
+        results = []
+        for stage in stages:
+            if stage == "state_load":
+                cold = measure(mcp_server.StateStore(mcp_server.STATE_FILE).load)
+                row = dict(measure(mcp_server.load_state, STATE_ITERATIONS), cold_seconds=cold["seconds"])
+            elif stage == "state_save":
+                states = [mcp_server.load_state() for _ in range(2)]
+                states[1].blocking_reason = "bench"
+                counter = iter(range(10 ** 9))
+                row = measure(lambda: mcp_server.save_state(states[next(counter) % 2]), STATE_ITERATIONS)
+            else:
+                if stage == "run_sim":
+                    # Don't depend on the lint stages having been selected
+                    state = mcp_server.load_state()
+                    state.state = max(state.state, mcp_server.State.LINT_PASSED)
+                    mcp_server.save_state(state)
+                row = measure(runners[stage])
+            results.append(dict(row, files=files, stage=stage))
+            print(f"{files:>6} files  {stage:<13} {row['seconds']:>10.4f}s  peak {row['peak_bytes'] / 1024:>10.1f} KiB", flush=True)
+        return results
+    finally:
+        os.chdir(cwd)
+        os.environ["PATH"] = path
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {(r["files"], r["stage"]): r for r in json.load(f)["results"]}
+    for row in results:
+        before = baseline.get((row["files"], row["stage"]))
+        if before and before["seconds"]:
+            ratio = row["seconds"] / before["seconds"]
+            flag = "  REGRESSION" if ratio > 1.2 else ""
+            print(f"{row['files']:>6} files  {row['stage']:<13} x{ratio:.2f} vs baseline{flag}")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--output", default="mcp_benchmark.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    results = []
+    for files in args.sizes:
+        results.extend(bench_size(files, tuple(args.stages)))
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": mcp_server.cpu_quota(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.baseline:
+        compare(results, args.baseline)
+    return report
+
+
+if __name__ == "__main__":
+    main()
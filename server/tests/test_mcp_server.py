@@ -0,0 +1,682 @@
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import mcp_server
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(mcp_server, "HASH_RACY_SECONDS", -1)
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_top.py").write_text("import cocotb\n")
+    (tmp_path / "tests" / "Makefile").write_text("TOPLEVEL = top\n")
+    (tmp_path / "tests" / "notes.txt").write_text("ignored\n")
+    return tmp_path
+
+
+def test_calculate_hashes_uses_cache(workspace, monkeypatch):
+    hashes = mcp_server.calculate_hashes("tests")
+    assert hashes == {
+        os.path.join("tests", "test_top.py"): hashlib.sha256(b"import cocotb\n").hexdigest(),
+        os.path.join("tests", "Makefile"): hashlib.sha256(b"TOPLEVEL = top\n").hexdigest(),
+    }
+
+    def fail(path):
+        raise AssertionError(f"{path} re-hashed")
+
+    monkeypatch.setattr(mcp_server, "_hash_file", fail)
+    assert mcp_server.calculate_hashes("tests") == hashes
+
+
+def test_calculate_hashes_detects_change(workspace):
+    before = mcp_server.calculate_hashes("tests")
+    path = workspace / "tests" / "test_top.py"
+    path.write_text("import cocotb  # edited\n")
+    os.utime(path, ns=(0, 0))
+    after = mcp_server.calculate_hashes("tests")
+    assert after[os.path.join("tests", "test_top.py")] != before[os.path.join("tests", "test_top.py")]
+
+    path.unlink()
+    assert os.path.join("tests", "test_top.py") not in mcp_server.calculate_hashes("tests")
+    assert os.path.join("tests", "test_top.py") not in mcp_server.load_hash_cache()
+
+
+def test_hash_large_file_matches_streaming(workspace, monkeypatch):
+    monkeypatch.setattr(mcp_server, "HASH_CHUNK_SIZE", 16)
+    data = os.urandom(1000)
+    (workspace / "tests" / "vectors.sv").write_bytes(data)
+    assert mcp_server._hash_file(os.path.join("tests", "vectors.sv")) == hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def stub_linters(tmp_path, monkeypatch):
+    """Linters that fail on files containing `bad` and hang on files containing `slow`."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = (
+        "#!/bin/sh\n"
+        "if [ \"$1\" = --version ]; then echo \"$0 1.0\"; exit 0; fi\n"
+        "for f; do :; done\n"
+        "if [ ! -f \"$f\" ]; then echo \"$0: cannot open $f\" >&2; exit 1; fi\n"
+        "if grep -q slow \"$f\"; then sleep 30; fi\n"
+        "if grep -q bad \"$f\"; then echo \"$0: error in $f\" >&2; exit 1; fi\n"
+    )
+    (bin_dir / "calls").write_text("")
+    script += f"echo \"$f\" >> {bin_dir / 'calls'}\n"
+    for name in ("verible-verilog-lint", "verilator"):
+        (bin_dir / name).write_text(script)
+        (bin_dir / name).chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    mcp_server.save_state(mcp_server.ProjectState(state=mcp_server.State.TEST_LOCKED))
+    (tmp_path / "src").mkdir()
+    return tmp_path / "src"
+
+
+def test_lint_passes(workspace, stub_linters):
+    (stub_linters / "a.v").write_text("module a; endmodule\n")
+    (stub_linters / "b.v").write_text("module b; endmodule\n")
+    assert "LINT_PASSED" in asyncio.run(mcp_server.lint(["src/a.v", "src/b.v"]))
+    assert mcp_server.load_state().state == mcp_server.State.LINT_PASSED
+
+
+def test_lint_fails_fast(workspace, stub_linters, monkeypatch):
+    monkeypatch.setattr(mcp_server, "LINT_WORKERS", 4)
+    (stub_linters / "bad.v").write_text("bad\n")
+    (stub_linters / "slow.v").write_text("slow\n")
+    start = time.monotonic()
+    result = asyncio.run(mcp_server.lint(["src/slow.v", "src/bad.v"]))
+    assert time.monotonic() - start < 10
+    assert result.startswith("Lint Failed (")
+    assert "error in src/bad.v" in result
+    assert "src/slow.v" not in result
+    assert mcp_server.load_state().blocking_reason.endswith("Lint failed for src/bad.v")
+
+
+def test_lint_cache_relints_only_changed_files(workspace, stub_linters):
+    calls = stub_linters.parent / "bin" / "calls"
+    (stub_linters / "defs.vh").write_text("`define W 8\n")
+    (stub_linters / "a.v").write_text('`include "defs.vh"\nmodule a; endmodule\n')
+    (stub_linters / "b.v").write_text("module b; endmodule\n")
+    asyncio.run(mcp_server.lint(["src/a.v", "src/b.v"]))
+    assert len(calls.read_text().split()) == 4
+
+    calls.write_text("")
+    asyncio.run(mcp_server.lint(["src/a.v", "src/b.v"]))
+    assert calls.read_text() == ""
+
+    # Editing an include only invalidates the Verilator result of its includer
+    (stub_linters / "defs.vh").write_text("`define W 16\n")
+    asyncio.run(mcp_server.lint(["src/a.v", "src/b.v"]))
+    assert calls.read_text().split() == ["src/a.v"]
+
+    # The Verible rules file is an input of every Verible job, and only those
+    calls.write_text("")
+    (workspace / mcp_server.VERIBLE_RULES_FILE).write_text("-line-length\n")
+    asyncio.run(mcp_server.lint(["src/a.v", "src/b.v"]))
+    assert sorted(calls.read_text().split()) == ["src/a.v", "src/b.v"]
+
+
+def test_lint_reports_missing_file(workspace, stub_linters):
+    (stub_linters / "a.v").write_text("module a; endmodule\n")
+    result = asyncio.run(mcp_server.lint(["src/a.v", "src/missing.v"]))
+    assert "Lint Failed" in result and "src/missing.v" in result
+
+    # Not cached: once the file exists it is linted for real
+    (stub_linters / "missing.v").write_text("module m; endmodule\n")
+    assert "LINT_PASSED" in asyncio.run(mcp_server.lint(["src/a.v", "src/missing.v"]))
+
+
+def test_lint_cache_evicts_least_recently_used(workspace):
+    for i in range(3):
+        res = mcp_server.subprocess.CompletedProcess(["lint", str(i)], 0, "", "")
+        mcp_server.lint_cache_put(f"k{i}", res)
+        os.utime(os.path.join(mcp_server.LINT_CACHE_DIR, f"k{i}.json"), ns=(i, i))
+    assert mcp_server.lint_cache_get("k0") is not None  # refreshes k0
+    mcp_server.lint_cache_evict(max_entries=2)
+    assert mcp_server.lint_cache_get("k1") is None
+    assert mcp_server.lint_cache_get("k0") is not None
+    assert mcp_server.lint_cache_get("k2") is not None
+
+
+@pytest.fixture
+def stub_make(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    (bin_dir / "make").write_text(f'#!/bin/sh\necho "$@" > {tmp_path / "make_args"}\necho FAILING_TESTS=0\n')
+    (bin_dir / "verilator").write_text("#!/bin/sh\necho Verilator 5.036\n")
+    for name in ("make", "verilator"):
+        (bin_dir / name).chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    mcp_server.save_state(mcp_server.ProjectState(state=mcp_server.State.LINT_PASSED))
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "top.sv").write_text("module top; endmodule\n")
+    (tmp_path / "Makefile").write_text("TOPLEVEL = top\nMODULE = test_top\n")
+    return lambda: (tmp_path / "make_args").read_text().split()
+
+
+def test_run_sim_reuses_model_for_unchanged_rtl(workspace, stub_make):
+    assert "reused" not in asyncio.run(mcp_server.run_sim("tests"))
+    first = stub_make()
+    assert first[0].startswith("SIM_BUILD=") and len(first) == 1
+    # Dumps land in SIM_BUILD; the backend's artifact manifest skips dot-directories
+    build_dir = os.path.relpath(first[0].split("=", 1)[1], workspace)
+    assert not any(part.startswith(".") for part in build_dir.split(os.sep))
+
+    # Test-only edits keep the model
+    (workspace / "Makefile").write_text("TOPLEVEL = top\nMODULE = test_other\n")
+    assert "reused cached model" in asyncio.run(mcp_server.run_sim("tests"))
+    top = os.path.join("src", "top.sv")
+    assert stub_make() == [first[0], f"--old-file={top}", f"--old-file={os.path.abspath(top)}"]
+
+    (workspace / "src" / "top.sv").write_text("module top; wire w; endmodule\n")
+    asyncio.run(mcp_server.run_sim("tests"))
+    assert stub_make()[0] != first[0]
+    assert len(stub_make()) == 1
+
+
+def test_design_profile_counts_lines_and_modules(workspace, monkeypatch):
+    monkeypatch.setattr(mcp_server, "HASH_CHUNK_SIZE", 8)
+    (workspace / "src").mkdir()
+    (workspace / "src" / "a.v").write_text("module a;\nendmodule\n\nmodule b;\nendmodule\n")
+    (workspace / "src" / "c.sv").write_text("  module c; endmodule\n")
+    profile = mcp_server.design_profile(mcp_server.rtl_files())
+    assert profile == {"files": 2, "lines": 6, "modules": 3, "systemverilog": True}
+
+
+def test_route_simulator_prefers_measured_turnaround():
+    profile = {"files": 1, "lines": 200, "modules": 1, "systemverilog": False}
+    # Small design, no history: Icarus avoids the C++ compile
+    assert mcp_server.route_simulator(profile, {}, {})["tool"] == "icarus"
+    # A cached Verilator model removes its compile cost
+    assert mcp_server.route_simulator(profile, {"verilator": True}, {})["tool"] == "verilator"
+    # Large designs amortise the compile
+    assert mcp_server.route_simulator(dict(profile, lines=5000), {}, {})["tool"] == "verilator"
+
+    history = {
+        "icarus": [{"lines": 200, "compile": 0.1, "run": 60.0}],
+        "verilator": [{"lines": 200, "compile": 12.0, "run": 2.0}],
+    }
+    routing = mcp_server.route_simulator(profile, {}, history)
+    assert routing["tool"] == "verilator"
+    assert routing["reason"].startswith("measured turnaround")
+
+    sv = dict(profile, systemverilog=True)
+    assert mcp_server.route_simulator(sv, {}, {})["tool"] == "verilator"
+
+
+def test_run_sim_records_routing_and_history(workspace, stub_make):
+    asyncio.run(mcp_server.run_sim("tests"))
+    routing = mcp_server.load_state().sim_routing
+    assert routing["tool"] == "verilator"
+    assert routing["reason"] == "SystemVerilog sources require Verilator"
+    [run] = mcp_server.load_sim_history()["verilator"]
+    assert run["lines"] == 1 and run["compile"] is not None
+
+    asyncio.run(mcp_server.run_sim("tests"))
+    assert mcp_server.load_sim_history()["verilator"][-1]["compile"] is None
+
+
+SHARD_MAKE = '''#!{python}
+import os, re, sys, time
+tests = ["test_a", "test_b", "test_c", "test_d"]
+pattern = os.environ.get("COCOTB_TEST_FILTER")
+selected = [t for t in tests if re.search(pattern, "test_top." + t)] if pattern else tests
+time.sleep(0.5)
+failing = [t for t in selected if t == os.environ.get("FAIL_TEST")]
+cases = "".join(
+    '<testcase name="%s" time="0.5">%s</testcase>' % (t, "<failure/>" if t in failing else "") for t in selected
+)
+with open(os.environ.get("COCOTB_RESULTS_FILE", "results.xml"), "w") as f:
+    f.write('<testsuites><testsuite name="all">%s</testsuite></testsuites>' % cases)
+print("FAILING_TESTS=%d" % len(failing))
+'''
+
+
+@pytest.fixture
+def shard_project(workspace, stub_make, monkeypatch):
+    make = workspace / "bin" / "make"
+    make.write_text(SHARD_MAKE.format(python=sys.executable))
+    monkeypatch.setattr(mcp_server, "cocotb_major_version", lambda: 2)
+    (workspace / "tests" / "test_top.py").write_text(
+        "import cocotb\n\n"
+        + "".join(f"@cocotb.test()\nasync def test_{n}(dut):\n    pass\n\n" for n in "abcd")
+    )
+    return workspace
+
+
+def test_discover_tests(shard_project):
+    assert mcp_server.discover_tests("tests") == ["test_a", "test_b", "test_c", "test_d"]
+
+
+def test_discover_tests_only_scans_makefile_modules(shard_project, monkeypatch):
+    for var in mcp_server.COCOTB_MODULE_VARS:
+        monkeypatch.delenv(var, raising=False)
+    (shard_project / "tests" / "test_other.py").write_text("import cocotb\n\n@cocotb.test()\nasync def test_z(dut):\n    pass\n")
+    (shard_project / "tests" / "helpers.py").write_text("@cocotb.test()\nasync def not_run(dut):\n    pass\n")
+    (shard_project / "tests" / "Makefile").write_text("TOPLEVEL = top\nMODULE = test_top\n")
+    assert mcp_server.discover_tests("tests") == ["test_a", "test_b", "test_c", "test_d"]
+
+    # make's own Makefile wins over the one next to the tests
+    (shard_project / "Makefile").write_text("TOPLEVEL = top\nMODULE = test_other,test_top\n")
+    assert mcp_server.discover_tests("tests") == ["test_z", "test_a", "test_b", "test_c", "test_d"]
+
+    monkeypatch.setenv("COCOTB_TEST_MODULES", "test_other")
+    assert mcp_server.discover_tests("tests") == ["test_z"]
+
+
+def test_run_sim_sharded_merges_results(shard_project):
+    start = time.monotonic()
+    result = asyncio.run(mcp_server.run_sim("tests", shards=4))
+    elapsed = time.monotonic() - start
+    assert "across 4 shards" in result
+    # One serial build shard, then three in parallel
+    assert elapsed < 1.8
+    summary = mcp_server.parse_results(str(shard_project / "results.xml"))
+    assert summary == {"tests": 4, "failures": 0, "time": 2.0}
+    assert mcp_server.load_state().state == mcp_server.State.VERIFIED
+
+
+def test_run_sim_sharded_failure(shard_project, monkeypatch):
+    monkeypatch.setenv("FAIL_TEST", "test_c")
+    result = asyncio.run(mcp_server.run_sim("tests", shards=2))
+    assert result.startswith("Simulation Failed")
+    assert mcp_server.load_state().state == mcp_server.State.LINT_PASSED
+
+
+def test_stream_command_rotates_and_keeps_tail(workspace, monkeypatch):
+    monkeypatch.setattr(mcp_server, "LOG_TAIL_LINES", 3)
+    monkeypatch.setattr(mcp_server, "LOG_MAX_BYTES", 40)
+    lines = []
+    cmd = [sys.executable, "-c", "import sys\nfor i in range(10): print('line', i)\nprint('oops', file=sys.stderr)"]
+    res, path = asyncio.run(mcp_server.stream_command(cmd, dict(os.environ), "sim", lines.append))
+    assert res.returncode == 0
+    assert res.stdout == "line 8\nline 9\noops\n"
+    assert len(lines) == 11
+    assert path == os.path.join(".openv", "logs", "sim.log")
+    assert os.path.getsize(path) <= 40 and os.path.exists(path + ".1")
+    logged = "".join(open(f"{path}.{i}").read() for i in range(mcp_server.LOG_BACKUPS, 0, -1) if os.path.exists(f"{path}.{i}"))
+    assert (logged + open(path).read()).endswith("line 9\noops\n")
+
+
+def test_stream_command_caps_tail_and_log_in_bytes(workspace, monkeypatch):
+    monkeypatch.setattr(mcp_server, "LOG_TAIL_MAX_BYTES", 100)
+    monkeypatch.setattr(mcp_server, "LOG_MAX_BYTES", 40)
+    cmd = [sys.executable, "-c", "for i in range(10): print('\u00e9' * 15)\nprint('x' * 500, end='')"]
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    res, path = asyncio.run(mcp_server.stream_command(cmd, env, "sim"))
+    assert res.stdout == "x" * 100
+    assert os.path.getsize(f"{path}.1") == 31  # one 31-byte line per file under a 40-byte limit
+
+    cmd = [sys.executable, "-c", "for i in range(10): print('\u00e9' * 15)"]
+    res, path = asyncio.run(mcp_server.stream_command(cmd, env, "sim"))
+    assert res.stdout == ("\u00e9" * 15 + "\n") * 3
+
+
+def test_stream_command_handles_long_lines_and_errors(workspace, monkeypatch):
+    monkeypatch.setattr(mcp_server, "LOG_LINE_MAX_BYTES", 100_000)
+    cmd = [sys.executable, "-c", "print('x' * 250_000); print('done', end='')"]
+    res, path = asyncio.run(mcp_server.stream_command(cmd, dict(os.environ), "sim"))
+    assert res.returncode == 0 and res.stdout.endswith("x\ndone")
+    assert open(path).read().count("\n") == 3
+
+    # A long line arriving together with its newline is split at the same points
+    monkeypatch.setattr(mcp_server, "STREAM_CHUNK_SIZE", 1 << 20)
+    res, path = asyncio.run(mcp_server.stream_command(cmd, dict(os.environ), "sim"))
+    assert [len(line) for line in open(path).read().split("\n")] == [100_000, 100_000, 50_000, 4]
+
+    # A failing line callback still takes the process group down with it
+    def fail(line):
+        raise RuntimeError("callback failed")
+
+    cmd = [sys.executable, "-c", "import os, time; print(os.getpid(), flush=True); time.sleep(30)"]
+    with pytest.raises(RuntimeError):
+        asyncio.run(mcp_server.stream_command(cmd, dict(os.environ), "sim", fail))
+    pid = int(open(path).read())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_run_sim_keeps_log_tail_in_state(workspace, stub_make, monkeypatch):
+    monkeypatch.setattr(mcp_server, "LOG_TAIL_LINES", 1)
+    asyncio.run(mcp_server.run_sim("tests"))
+    state = mcp_server.load_state()
+    assert state.last_log == "FAILING_TESTS=0\n"
+    assert state.last_log_path == os.path.join(".openv", "logs", "sim.log")
+
+
+def test_state_store_caches_and_skips_noop_writes(workspace, monkeypatch):
+    store = mcp_server.StateStore(mcp_server.STATE_FILE)
+    state = store.load()
+    state.top_module = "top"
+    store.save(state)
+    inode = os.stat(mcp_server.STATE_FILE).st_ino
+
+    monkeypatch.setattr(mcp_server.ProjectState, "model_validate", lambda data: pytest.fail("re-parsed"))
+    loaded = store.load()
+    assert loaded.top_module == "top"
+    loaded.top_module = "mutated"
+    assert store.load().top_module == "top"
+
+    store.save(store.load())
+    assert os.stat(mcp_server.STATE_FILE).st_ino == inode
+
+
+def test_state_store_reloads_external_writes(workspace):
+    store = mcp_server.StateStore(mcp_server.STATE_FILE)
+    store.save(mcp_server.ProjectState(top_module="a"))
+    mcp_server.StateStore(mcp_server.STATE_FILE).save(mcp_server.ProjectState(top_module="b"))
+    assert store.load().top_module == "b"
+
+
+def test_state_store_concurrent_saves_stay_valid(workspace):
+    stores = [mcp_server.StateStore(mcp_server.STATE_FILE) for _ in range(4)]
+
+    def writer(i):
+        for n in range(25):
+            stores[i].save(mcp_server.ProjectState(top_module=f"w{i}-{n}"))
+            assert stores[(i + 1) % 4].load().top_module.startswith("w")
+
+    with mcp_server.ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(writer, range(4)))
+    assert mcp_server.StateStore(mcp_server.STATE_FILE).load().top_module.endswith("-24")
+
+
+def test_tool_timeout_kills_process(workspace, stub_make, monkeypatch):
+    (workspace / "bin" / "make").write_text("#!/bin/sh\nsleep 30\n")
+    monkeypatch.setitem(mcp_server.TOOL_TIMEOUTS, "run_sim", 0.5)
+    start = time.monotonic()
+    result = asyncio.run(mcp_server.run_exclusive("run_sim", mcp_server.run_sim, "tests"))
+    assert time.monotonic() - start < 5
+    assert result.startswith("TimeoutError: run_sim")
+    assert mcp_server.load_state().blocking_reason == "run_sim timed out after 0.5s"
+
+
+def test_status_answers_during_long_job(workspace, stub_make):
+    (workspace / "bin" / "make").write_text("#!/bin/sh\nsleep 1\necho FAILING_TESTS=0\n")
+
+    async def scenario():
+        sim = asyncio.create_task(mcp_server.run_exclusive("run_sim", mcp_server.run_sim, "tests"))
+        await asyncio.sleep(0.3)
+        start = time.monotonic()
+        status = mcp_server.get_status()
+        assert time.monotonic() - start < 0.1
+        assert not sim.done()
+        return status, await sim
+
+    status, result = asyncio.run(scenario())
+    assert status["state"] == mcp_server.State.LINT_PASSED
+    assert "VERIFIED" in result
+
+
+def test_run_exclusive_waits_for_other_processes(workspace):
+    import fcntl
+    os.makedirs(".openv", exist_ok=True)
+
+    async def scenario():
+        with open(mcp_server.PIPELINE_LOCK_FILE, "w") as held:
+            # Another process (the agent daemon or MCP server) holds the workspace lock
+            fcntl.flock(held, fcntl.LOCK_EX)
+            task = asyncio.create_task(mcp_server.run_exclusive("lint", asyncio.sleep, 0, "ran"))
+            await asyncio.sleep(0.3)
+            assert not task.done()
+        return await asyncio.wait_for(task, 5)
+
+    assert asyncio.run(scenario()) == "ran"
+
+
+YOSYS_STUB = '''#!{python}
+import re, sys
+if sys.argv[1:] == ["--version"]:
+    print("Yosys 0.48 (stub)")
+    sys.exit(0)
+script = sys.argv[2]
+with open({calls!r}, "a") as f:
+    f.write(script + "\\n")
+for path in re.findall(r"write_rtlil ([^\\s;]+)", script):
+    open(path, "w").write("# rtlil\\n")
+for path in re.findall(r"write_verilog ([^\\s;]+)", script):
+    open(path, "w").write("module top(); endmodule\\n")
+for path in re.findall(r"tee -q -o ([^\\s;]+)", script):
+    open(path, "w").write('{{"design": {{"num_cells": 42}}}}')
+'''
+
+
+@pytest.fixture
+def synth_project(workspace, stub_make, monkeypatch):
+    calls = workspace / "yosys_calls"
+    calls.write_text("")
+    (workspace / "bin" / "yosys").write_text(YOSYS_STUB.format(python=sys.executable, calls=str(calls)))
+    (workspace / "bin" / "yosys").chmod(0o755)
+    (workspace / "src" / "top.v").write_text("module top; endmodule\n")
+    mcp_server.save_state(mcp_server.ProjectState(state=mcp_server.State.VERIFIED, top_module="top"))
+    return lambda: [line for line in calls.read_text().splitlines() if line]
+
+
+def test_run_synth_restores_unchanged_rtl(synth_project, workspace):
+    result = asyncio.run(mcp_server.run_synth())
+    assert "Cells: 42" in result and "restored" not in result
+    [script] = synth_project()
+    assert script.startswith("read_verilog src/top.v") and "write_rtlil" in script
+
+    (workspace / "synth.v").unlink()
+    result = asyncio.run(mcp_server.run_synth())
+    assert "restored from cache" in result
+    assert (workspace / "synth.v").exists()
+    assert len(synth_project()) == 1
+
+
+def test_run_synth_tracks_included_headers(synth_project, workspace):
+    (workspace / "src" / "defs.vh").write_text("`define W 8\n")
+    (workspace / "src" / "top.v").write_text('`include "defs.vh"\nmodule top; endmodule\n')
+    asyncio.run(mcp_server.run_synth())
+    (workspace / "src" / "defs.vh").write_text("`define W 16\n")
+    assert "restored" not in asyncio.run(mcp_server.run_synth())
+    assert len(synth_project()) == 2
+
+
+def test_run_synth_resumes_from_checkpoint(synth_project, monkeypatch):
+    asyncio.run(mcp_server.run_synth())
+    monkeypatch.setattr(mcp_server, "SYNTH_BACK_SCRIPT", mcp_server.SYNTH_BACK_SCRIPT.replace("synth ", "synth -flatten ", 1))
+    assert "SYNTHESIZED" in asyncio.run(mcp_server.run_synth())
+    second = synth_project()[1]
+    assert second.startswith("read_rtlil ") and "read_verilog" not in second
+
+
+STA_REPORT = """Startpoint: u_core/r1 (rising edge-triggered flip-flop clocked by clk)
+Endpoint: u_core/r2 (rising edge-triggered flip-flop clocked by clk)
+Path Group: clk
+Path Type: max
+
+  Delay    Time   Description
+---------------------------------------------------------
+   0.000   0.000   clock clk (rise edge)
+   0.000   0.000 ^ u_core/r1/CLK (sky130_fd_sc_hd__dfxtp_1)
+   0.320   0.320 ^ u_core/r1/Q (sky130_fd_sc_hd__dfxtp_1)
+   0.150   0.470 v u_core/g1/Y (sky130_fd_sc_hd__inv_1)
+   0.000   0.470 v u_core/r2/D (sky130_fd_sc_hd__dfxtp_1)
+           0.470   data arrival time
+
+  10.000  10.000   clock clk (rise edge)
+  -0.100   9.900   library setup time
+           9.900   data required time
+---------------------------------------------------------
+           9.430   slack (MET)
+
+
+Startpoint: in_a (input port clocked by clk)
+Endpoint: u_io/r0 (rising edge-triggered flip-flop clocked by clk)
+Path Group: clk
+Path Type: max
+
+  Delay    Time   Description
+---------------------------------------------------------
+   0.000   0.000 ^ in_a (in)
+   0.200   0.200 ^ u_io/r0/D (sky130_fd_sc_hd__dfxtp_1)
+           0.200   data arrival time
+---------------------------------------------------------
+          -0.050   slack (VIOLATED)
+
+wns max -0.050
+tns max -0.050
+"""
+
+
+def test_parse_sta_report():
+    report = mcp_server.parse_sta_report(STA_REPORT)
+    assert (report["wns"], report["tns"]) == (-0.05, -0.05)
+    first, second = report["paths"]
+    assert (first["startpoint"], first["endpoint"], first["group"]) == ("u_core/r1", "u_core/r2", "clk")
+    assert first["slack"] == 9.43 and first["met"]
+    assert [p["pin"] for p in first["points"]] == ["u_core/r1/CLK", "u_core/r1/Q", "u_core/g1/Y", "u_core/r2/D"]
+    assert first["points"][2] == {"pin": "u_core/g1/Y", "cell": "sky130_fd_sc_hd__inv_1", "edge": "fall", "delay": 0.15, "time": 0.47}
+    assert not second["met"]
+    assert mcp_server.paths_through(report["paths"], "u_io") == [second]
+    assert mcp_server.parse_sta_report("Error: link failed") is None
+
+
+@pytest.fixture
+def sta_project(workspace, stub_make, monkeypatch):
+    calls = workspace / "sta_calls"
+    (workspace / "report.txt").write_text(STA_REPORT)
+    (workspace / "bin" / "sta").write_text(f"#!/bin/sh\necho \"$@\" >> {calls}\ncat {workspace / 'report.txt'}\n")
+    (workspace / "bin" / "sta").chmod(0o755)
+    (workspace / "cells.lib").write_text("library (cells) {}\n")
+    (workspace / "top.sdc").write_text("create_clock -period 10 [get_ports clk]\n")
+    (workspace / "synth.v").write_text("module top(); endmodule\n")
+    monkeypatch.setenv("OPENV_LIBERTY", str(workspace / "cells.lib"))
+    mcp_server.save_state(mcp_server.ProjectState(state=mcp_server.State.SYNTHESIZED, top_module="top"))
+    return lambda: [c for c in calls.read_text().splitlines() if "-exit" in c] if calls.exists() else []
+
+
+def test_run_sta_memoises_report(sta_project, workspace):
+    result = asyncio.run(mcp_server.run_sta("top.sdc"))
+    assert result["wns"] == -0.05 and result["matched_paths"] == 2 and not result["cached"]
+    assert len(sta_project()) == 1
+
+    subset = asyncio.run(mcp_server.run_sta("top.sdc", through="u_core", max_paths=5))
+    assert subset["cached"] and subset["matched_paths"] == 1
+    assert subset["paths"][0]["endpoint"] == "u_core/r2"
+    assert len(sta_project()) == 1
+
+    (workspace / "top.sdc").write_text("create_clock -period 5 [get_ports clk]\n")
+    assert not asyncio.run(mcp_server.run_sta("top.sdc"))["cached"]
+    assert len(sta_project()) == 2
+
+
+def test_run_sta_requires_liberty(sta_project, monkeypatch):
+    monkeypatch.setenv("OPENV_LIBERTY", "/nonexistent.lib")
+    monkeypatch.setenv("PDK_ROOT", "/nonexistent")
+    assert asyncio.run(mcp_server.run_sta()).startswith("Error: No liberty file")
+
+
+@pytest.fixture
+def pipeline_project(workspace, synth_project, sta_project):
+    (workspace / "bin" / "verible-verilog-lint").write_text("#!/bin/sh\nexit 0\n")
+    (workspace / "bin" / "verible-verilog-lint").chmod(0o755)
+    (workspace / "synth.v").unlink()
+    mcp_server.save_state(mcp_server.ProjectState())
+    assert "TEST_LOCKED" in mcp_server.init_test("tests", "top")
+
+    def runs():
+        # Tools invoked since the last call: make per simulation, yosys per synthesis, sta per timing run
+        ran = {"sim": (workspace / "make_args").exists(), "synth": len(synth_project()), "sta": len(sta_project())}
+        (workspace / "make_args").unlink(missing_ok=True)
+        (workspace / "yosys_calls").write_text("")
+        (workspace / "sta_calls").write_text("")
+        return ran
+
+    return runs
+
+
+def test_pipeline_reruns_only_stale_stages(pipeline_project, workspace):
+    def statuses(result):
+        return {s["stage"]: s["status"] for s in result["stages"]}
+
+    result = asyncio.run(mcp_server.run_pipeline("TIMED", constraints_file="top.sdc"))
+    assert statuses(result) == {"lint": "ran", "sim": "ran", "synth": "ran", "sta": "ran"}
+    assert result["state"] == "SYNTHESIZED" and result["stages"][3]["result"]["wns"] == -0.05
+    assert pipeline_project() == {"sim": True, "synth": 1, "sta": 1}
+
+    result = asyncio.run(mcp_server.run_pipeline("TIMED", constraints_file="top.sdc"))
+    assert set(statuses(result).values()) == {"skipped"}
+    assert result["stages"][3]["result"] == {"wns": -0.05, "tns": -0.05, "matched_paths": 2}
+    assert pipeline_project() == {"sim": False, "synth": 0, "sta": 0}
+
+    # Only the last stage reads the constraints
+    (workspace / "top.sdc").write_text("create_clock -period 5 [get_ports clk]\n")
+    result = asyncio.run(mcp_server.run_pipeline("TIMED", constraints_file="top.sdc"))
+    assert statuses(result) == {"lint": "skipped", "sim": "skipped", "synth": "skipped", "sta": "ran"}
+    assert pipeline_project() == {"sim": False, "synth": 0, "sta": 1}
+
+    # An RTL edit invalidates everything downstream of lint; SYNTHESIZED stops before timing
+    (workspace / "src" / "top.v").write_text("module top; wire w; endmodule\n")
+    result = asyncio.run(mcp_server.run_pipeline())
+    assert statuses(result) == {"lint": "ran", "sim": "ran", "synth": "ran"}
+    assert pipeline_project() == {"sim": True, "synth": 1, "sta": 0}
+    assert "sta" not in mcp_server.load_state().pipeline
+
+
+def test_pipeline_stops_at_failing_stage(pipeline_project, workspace):
+    (workspace / "bin" / "make").write_text("#!/bin/sh\necho FAILING_TESTS=1\nexit 1\n")
+    result = asyncio.run(mcp_server.run_pipeline())
+    assert [(s["stage"], s["status"]) for s in result["stages"]] == [("lint", "ran"), ("sim", "failed")]
+    assert result["state"] == "LINT_PASSED"
+    assert set(mcp_server.load_state().pipeline) == {"lint"}
+    assert asyncio.run(mcp_server.run_pipeline("nope")).startswith("Error: Unknown target")
+
+
+def test_benchmark_smoke(tmp_path):
+    from server.benchmarks import bench_pipeline
+
+    output = tmp_path / "bench.json"
+    report = bench_pipeline.main(["--sizes", "3", "--output", str(output)])
+    assert json.loads(output.read_text()) == report
+    assert [r["stage"] for r in report["results"]] == list(bench_pipeline.STAGES)
+    assert all(r["files"] == 3 and r["seconds"] >= 0 for r in report["results"])
+
+
+def test_cli_runs_single_tool(workspace):
+    mcp_server.save_state(mcp_server.ProjectState(top_module="top"))
+    script = os.path.join(os.path.dirname(mcp_server.__file__), "mcp_server.py")
+    res = subprocess.run(
+        [sys.executable, script, "--tool", "openv_get_status", "--args", "{}"], capture_output=True, text=True
+    )
+    assert res.returncode == 0, res.stderr
+    assert json.loads(res.stdout)["top_module"] == "top"
+
+
+def test_agent_daemon_serves_rpc(workspace):
+    mcp_server.save_state(mcp_server.ProjectState(top_module="top"))
+
+    async def scenario():
+        server = asyncio.create_task(mcp_server.serve_agent(mcp_server.AGENT_SOCKET))
+        while not os.path.exists(mcp_server.AGENT_SOCKET):
+            await asyncio.sleep(0.01)
+        # A second agent for the same workspace exits instead of stealing the socket
+        await asyncio.wait_for(mcp_server.serve_agent(mcp_server.AGENT_SOCKET), 5)
+        reader, writer = await asyncio.open_unix_connection(mcp_server.AGENT_SOCKET)
+        replies = []
+        for request in (
+            {"id": 1, "tool": "openv_get_status"},
+            {"id": 2, "tool": "openv_nope", "args": {}},
+            {"id": 3, "tool": "openv_lint", "args": {"src_files": []}},
+        ):
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            replies.append(json.loads(await reader.readline()))
+        writer.close()
+        server.cancel()
+        return replies
+
+    status, unknown, lint = asyncio.run(scenario())
+    assert status["ok"] and status["result"]["top_module"] == "top"
+    assert not unknown["ok"] and unknown["error"] == "ValueError: Unknown tool: openv_nope"
+    assert lint["id"] == 3 and "WorkflowViolationError" in lint["result"]